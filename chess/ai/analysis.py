@@ -0,0 +1,171 @@
+# Headless batch analysis of FEN/EPD positions.
+#
+# Each position is searched by one engine to a fixed depth or time budget
+# in a pool of worker processes, and one JSON object per position is
+# streamed out as soon as it can be written, either in input order or in
+# completion order. Progress and throughput go to stderr:
+#
+#     python -m chess.ai.analysis positions.epd --engine minimax_bit --depth 4 --workers 8 > results.jsonl
+#
+# Input is read lazily with only a bounded number of positions in flight, so
+# files of any size are analysed in constant memory.
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+from chess.bitboard import SQUARE_NAMES
+from chess.chess_board import ChessBoard
+from chess.epd import iter_records
+from chess.pieces import Queen, Rook, Bishop, Knight
+from chess.ai.minimax_ai import MinimaxAI
+from chess.ai.minimax_bit_ai import MinimaxBitAI
+
+ENGINES = {'minimax': MinimaxAI, 'minimax_bit': MinimaxBitAI}
+PROMOTION_LETTERS = {Queen: 'q', Rook: 'r', Bishop: 'b', Knight: 'n'}
+IN_FLIGHT_PER_WORKER = 4
+
+# Per-process engines, one per side to move, created by the pool initializer
+worker_settings = None
+worker_engines = {}
+
+def init_analysis_worker(engine, depth, time_limit, hash_mb):
+    global worker_settings
+    worker_settings = (engine, depth, time_limit, hash_mb)
+    worker_engines.clear()
+
+def worker_engine(color):
+    ai = worker_engines.get(color)
+    if ai is None:
+        engine, depth, time_limit, hash_mb = worker_settings
+        ai = worker_engines[color] = ENGINES[engine](color, depth=depth, time_limit=time_limit,
+                                                     hash_size_mb=hash_mb)
+    return ai
+
+def close_worker_engines():
+    for ai in worker_engines.values():
+        if hasattr(ai, 'close'):
+            ai.close()
+    worker_engines.clear()
+
+def move_name(chess_board, move, promotion):
+    # Long algebraic (UCI) name of a ChessBoard move
+    start, end = move
+    name = SQUARE_NAMES[chess_board.square_index(*start)] + SQUARE_NAMES[chess_board.square_index(*end)]
+    return name + PROMOTION_LETTERS.get(promotion, '')
+
+def analyse_position(index, line_number, fen, operations):
+    record = {'index': index, 'line': line_number, 'fen': fen}
+    if 'id' in operations:
+        record['id'] = ' '.join(operations['id'])
+    try:
+        chess_board = ChessBoard.from_fen(fen)
+    except ValueError as error:
+        record['error'] = str(error)
+        return record
+    if not chess_board.get_status(chess_board.side_to_move).moves:
+        record['error'] = "No legal moves"
+        return record
+    ai = worker_engine(chess_board.side_to_move)
+    result = ai.make_move(chess_board, chess_board.flipped)
+    stats = result.stats
+    record.update(
+        move=move_name(chess_board, result.move, result.promotion),
+        score=stats.score,
+        depth=stats.depth,
+        nodes=stats.nodes,
+        seconds=round(stats.elapsed, 6),
+        nps=round(stats.nps),
+    )
+    for opcode in ('bm', 'am'):
+        if opcode in operations:
+            record[opcode] = operations[opcode]
+    return record
+
+def analyse(records, engine, depth, time_limit, workers, in_order=True, hash_mb=16):
+    # Yield one result per (line number, fen, operations) record
+    init_analysis_worker(engine, depth, time_limit, hash_mb)
+    if workers <= 1:
+        try:
+            for index, (line_number, fen, operations) in enumerate(records):
+                yield analyse_position(index, line_number, fen, operations)
+        finally:
+            close_worker_engines()
+        return
+
+    limit = workers * IN_FLIGHT_PER_WORKER
+    records = enumerate(records)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_analysis_worker,
+                                                initargs=(engine, depth, time_limit, hash_mb)) as executor:
+        pending = set()
+        finished = {}  # Results waiting for an earlier position, by index
+        next_index = 0
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) + len(finished) < limit:
+                record = next(records, None)
+                if record is None:
+                    exhausted = True
+                    break
+                index, (line_number, fen, operations) = record
+                pending.add(executor.submit(analyse_position, index, line_number, fen, operations))
+            if not pending:
+                break
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if not in_order:
+                    yield result
+                else:
+                    finished[result['index']] = result
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse FEN/EPD positions with an engine across processes.")
+    parser.add_argument('input', help="FEN or EPD file (.gz allowed), or - for stdin")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='minimax_bit')
+    parser.add_argument('--depth', type=int, default=None, help="search depth (engine default without --time)")
+    parser.add_argument('--time', type=float, metavar='SECONDS', help="time budget per position")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--order', choices=['input', 'completion'], default='input',
+                        help="write results in input order or as they complete")
+    parser.add_argument('--hash', type=int, default=16, metavar='MB', help="transposition table size per engine")
+    parser.add_argument('--output', metavar='PATH', help="write JSONL here instead of stdout")
+    parser.add_argument('--skip-invalid', action='store_true', help="skip malformed lines instead of stopping")
+    parser.add_argument('--progress', type=float, default=5.0, metavar='SECONDS',
+                        help="seconds between progress reports on stderr (0 for none)")
+    args = parser.parse_args(argv)
+
+    records = iter_records(sys.stdin if args.input == '-' else args.input, args.skip_invalid)
+    output = open(args.output, 'w') if args.output else sys.stdout
+    start_time = last_report = time.perf_counter()
+    positions = nodes = errors = 0
+    try:
+        for result in analyse(records, args.engine, args.depth, args.time, args.workers,
+                              args.order == 'input', args.hash):
+            output.write(json.dumps(result) + '\n')
+            positions += 1
+            nodes += result.get('nodes', 0)
+            errors += 'error' in result
+            now = time.perf_counter()
+            if args.progress and now - last_report >= args.progress:
+                output.flush()
+                elapsed = now - start_time
+                print(f"{positions} positions in {elapsed:.1f}s ({positions / elapsed:.1f}/s, "
+                      f"{nodes / elapsed:.0f} nodes/s)", file=sys.stderr)
+                last_report = now
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start_time
+    print(f"{positions} positions, {errors} errors, {nodes} nodes in {elapsed:.1f}s "
+          f"({positions / elapsed if elapsed else 0:.1f} positions/s, {nodes / elapsed if elapsed else 0:.0f} nodes/s)",
+          file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,74 +1,321 @@
-from chess.pieces import Queen
+from chess.pieces import Queen, Pawn
+from chess.bitboard import ONGOING, CHECKMATE, PIECE_CODES, PAWN, QUEEN, COLOR_INDEX
+from chess.psqt import PIECE_VALUES
+from chess.ai.evaluation_cache import EvaluationCache
+from chess.ai.search_stats import SearchStats, SearchResult
+from chess.ai.move_ordering import MoveOrdering
+from chess.ai.transposition_table import NO_MOVE, pack_move
+from chess.ai.opening_book import OpeningBook
 
 from abc import ABC, abstractmethod
+from time import perf_counter, monotonic
+
+MATE_SCORE = 1000000
+MAX_SEARCH_DEPTH = 64  # Depth cap for budgeted searches given no depth
+CLOCK_CHECK_MASK = 0xFF  # Read the clock once every 256 nodes
+ASPIRATION_WINDOW = 50  # Half-width of the root window around the last score
+MAX_QUIESCENCE_PLY = 16  # Captures searched beyond the horizon at most
+DELTA_MARGIN = 200  # Positional slack allowed when delta pruning captures
+
+class SearchTimeout(Exception):
+    # Raised inside the search when its time or node budget runs out
+    pass
 
 class BaseAI(ABC):
-    def __init__(self, color, evaluation_function):
+    def __init__(self, color, evaluation_function, eval_cache_entries=1 << 16, on_iteration=None,
+                 time_limit=None, node_limit=None, quiescence=True, book=None):
         self.color = color
         self.evaluation_function = evaluation_function
-        self.evaluation_cache = {}
+        self.evaluation_cache = EvaluationCache(eval_cache_entries)
+        self.stats = SearchStats()
+        # Called with the running SearchStats after each completed depth
+        self.on_iteration = on_iteration
+        self.search_start = 0.0
+        # Budgets per make_move: seconds of wall time and searched nodes
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.deadline = None
+        self.limits_armed = False
+        self.move_ordering = MoveOrdering()
+        self.root_depth = 0  # Depth of the current iteration, for ply numbers
+        # Resolve captures past the horizon instead of scoring leaves as they are
+        self.quiescence = quiescence
+        # Polyglot book (an OpeningBook or a path) probed before searching
+        self.book = OpeningBook(book) if isinstance(book, str) else book
 
-    @abstractmethod
     def make_move(self, chess_board, player_flipped):
+        # Positions in the opening book are answered without a search
+        if self.book is not None:
+            book_move = self.book.probe(chess_board)
+            if book_move is not None:
+                self.begin_search()
+                self.stats.book_hits += 1
+                return self.finish_search(*book_move)
+        return self.search_move(chess_board, player_flipped)
+
+    @abstractmethod
+    def search_move(self, chess_board, player_flipped):
         pass
 
+    def new_game(self):
+        # Forget positions from the previous game
+        self.evaluation_cache.clear()
+        self.move_ordering.clear()
+
+    def begin_search(self):
+        self.stats = SearchStats()
+        self.search_start = perf_counter()
+        # monotonic() rather than perf_counter() so that worker processes
+        # can compare against the same deadline
+        self.deadline = None if self.time_limit is None else monotonic() + self.time_limit
+        # The first iteration always completes so there is a move to return
+        self.limits_armed = False
+        self.move_ordering.new_search()
+
+    def resolve_depth(self, depth, default):
+        # Without an explicit depth a budgeted search deepens until the
+        # budget runs out, and an unbudgeted one uses the engine default
+        if depth is not None:
+            return depth
+        if self.time_limit is not None or self.node_limit is not None:
+            return MAX_SEARCH_DEPTH
+        return default
+
+    def check_limits(self):
+        # Called on every node, so the clock is only read every 256 nodes
+        if not self.limits_armed:
+            return
+        if self.node_limit is not None and self.stats.nodes >= self.node_limit:
+            raise SearchTimeout()
+        if self.deadline is not None and not self.stats.nodes & CLOCK_CHECK_MASK and monotonic() >= self.deadline:
+            raise SearchTimeout()
+
+    def can_deepen(self):
+        # Whether another iteration is worth starting. Each one usually takes
+        # several times longer than the last, so stop once half the time is
+        # used rather than start one that will be thrown away
+        self.limits_armed = True
+        if self.node_limit is not None and self.stats.nodes >= self.node_limit:
+            return False
+        if self.deadline is not None:
+            return monotonic() < self.deadline - self.time_limit / 2
+        return True
+
+    def report_iteration(self, depth, score=None):
+        self.stats.depth = depth
+        self.stats.score = score
+        self.stats.elapsed = perf_counter() - self.search_start
+        if self.on_iteration:
+            self.on_iteration(self.stats)
+
+    def finish_search(self, move, promotion):
+        self.stats.elapsed = perf_counter() - self.search_start
+        return SearchResult(move, promotion, self.stats)
+
+    def get_status(self, board, color):
+        # Legal move generation (legality is part of generation) with timing
+        start = perf_counter()
+        status = board.get_status(color)
+        self.stats.movegen_time += perf_counter() - start
+        return status
+
+    def aspiration_window(self, score):
+        # Root window for the next iteration, centred on the previous score.
+        # Mate scores jump between iterations, so they get the full window
+        if score is None or abs(score) >= MATE_SCORE:
+            return float('-inf'), float('inf')
+        return score - ASPIRATION_WINDOW, score + ASPIRATION_WINDOW
+
+    def side_to_move(self, maximizing_player):
+        if maximizing_player:
+            return self.color
+        return 'black' if self.color == 'white' else 'white'
+
+    def terminal_score(self, status, color, depth):
+        # Mate scores grow with the remaining depth so quicker mates rank higher
+        if status.result == CHECKMATE:
+            return -(MATE_SCORE + depth) if color == self.color else MATE_SCORE + depth
+        return 0
+
     def minimax(self, chess_board, depth, maximizing_player, alpha, beta):
-        if depth == 0 or chess_board.is_checkmate(self.color) or chess_board.is_stalemate(self.color):
+        if depth == 0 and self.quiescence:
+            return self.quiesce(chess_board, maximizing_player, alpha, beta, 0)
+        self.stats.nodes += 1
+        self.check_limits()
+        if depth == 0:
             return self.evaluate_board(chess_board)
+        color = self.side_to_move(maximizing_player)
+        status = self.get_status(chess_board, color)
+        if status.result != ONGOING:
+            return self.terminal_score(status, color, depth)
 
+        moves = self.order_moves(chess_board, status.moves, NO_MOVE, depth, color)
         if maximizing_player:
             max_eval = float('-inf')
-            for move in self.get_all_possible_moves(chess_board, self.color):
-                chess_board.update_board(move)
-                eval = self.minimax(chess_board, depth - 1, False, alpha, beta)
-                chess_board.undo_move(move)
+            for index, move in enumerate(moves):
+                self.make_search_move(chess_board, move)
+                # Principal variation search: the first move gets the full
+                # window, the rest a null window proving they are no better,
+                # re-searched only when that fails high
+                if index == 0:
+                    eval = self.minimax(chess_board, depth - 1, False, alpha, beta)
+                else:
+                    eval = self.minimax(chess_board, depth - 1, False, alpha, alpha + 1)
+                    if alpha < eval < beta:
+                        self.stats.researches += 1
+                        eval = self.minimax(chess_board, depth - 1, False, alpha, beta)
+                chess_board.undo_move()
                 max_eval = max(max_eval, eval)
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self.record_cutoff(chess_board, move, index, depth, color)
                     break
             return max_eval
         else:
             min_eval = float('inf')
-            opponent_color = 'black' if self.color == 'white' else 'white'
-            for move in self.get_all_possible_moves(chess_board, opponent_color):
-                chess_board.update_board(move)
-                eval = self.minimax(chess_board, depth - 1, True, alpha, beta)
-                chess_board.undo_move(move)
+            for index, move in enumerate(moves):
+                self.make_search_move(chess_board, move)
+                if index == 0:
+                    eval = self.minimax(chess_board, depth - 1, True, alpha, beta)
+                else:
+                    eval = self.minimax(chess_board, depth - 1, True, beta - 1, beta)
+                    if alpha < eval < beta:
+                        self.stats.researches += 1
+                        eval = self.minimax(chess_board, depth - 1, True, alpha, beta)
+                chess_board.undo_move()
                 min_eval = min(min_eval, eval)
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self.record_cutoff(chess_board, move, index, depth, color)
                     break
             return min_eval
 
+    def quiesce(self, board, maximizing_player, alpha, beta, ply):
+        # Capture-only search below the horizon. The side to move may stand
+        # pat on the static score; captures that cannot lift it back into
+        # the window (delta pruning) or that lose material in the exchange
+        # they start are skipped. In check every evasion is searched
+        self.stats.nodes += 1
+        self.stats.quiescence_nodes += 1
+        self.check_limits()
+        color = self.side_to_move(maximizing_player)
+        in_check = board.is_in_check(color)
+        if not in_check or ply >= MAX_QUIESCENCE_PLY:
+            # Standing pat usually settles the node before any move is generated
+            stand_pat = self.evaluate_board(board)
+            if ply >= MAX_QUIESCENCE_PLY:
+                return stand_pat
+            if maximizing_player:
+                if stand_pat >= beta:
+                    return stand_pat
+                alpha = max(alpha, stand_pat)
+            else:
+                if stand_pat <= alpha:
+                    return stand_pat
+                beta = min(beta, stand_pat)
+
+        status = self.get_status(board, color)
+        if status.result != ONGOING:
+            return self.terminal_score(status, color, 0)
+        if in_check:
+            best = float('-inf') if maximizing_player else float('inf')
+            moves = status.moves
+            infos = [self.move_info(board, move) for move in moves]
+        else:
+            best = stand_pat
+            moves, infos = [], []
+            for move in self.tactical_moves(board, status.moves):
+                info = self.move_info(board, move)
+                _, victim, attacker, promotion = info
+                if promotion not in (None, QUEEN):
+                    continue  # Under-promotions are left to the main search
+                gain = ((0 if victim is None else PIECE_VALUES[victim])
+                        + (0 if promotion is None else PIECE_VALUES[QUEEN] - PIECE_VALUES[PAWN]))
+                if (stand_pat + gain + DELTA_MARGIN <= alpha if maximizing_player
+                        else stand_pat - gain - DELTA_MARGIN >= beta):
+                    continue
+                if (victim is not None and PIECE_VALUES[attacker] > PIECE_VALUES[victim]
+                        and self.static_exchange(board, move) < 0):
+                    continue
+                moves.append(move)
+                infos.append(info)
+
+        # Most valuable victim, least valuable attacker first
+        moves = self.move_ordering.order(moves, infos, NO_MOVE, self.root_depth + ply, COLOR_INDEX[color])
+        for move in moves:
+            self.make_search_move(board, move)
+            score = self.quiesce(board, not maximizing_player, alpha, beta, ply + 1)
+            board.undo_move()
+            if maximizing_player:
+                best = max(best, score)
+                alpha = max(alpha, score)
+            else:
+                best = min(best, score)
+                beta = min(beta, score)
+            if beta <= alpha:
+                break
+        return best
+
+    def tactical_moves(self, chess_board, moves):
+        # Captures, en passant included, and promotions
+        board = chess_board.board
+        return [(start, end) for start, end in moves
+                if board[end[0]][end[1]] is not None
+                or (isinstance(board[start[0]][start[1]], Pawn) and (start[1] != end[1] or end[0] in (0, 7)))]
+
+    def make_search_move(self, chess_board, move):
+        # Search plays ChessBoard promotions as queens, like make_move
+        chess_board.update_board(move)
+        start, end = move
+        if end[0] in (0, 7) and isinstance(chess_board.board[end[0]][end[1]], Pawn):
+            chess_board.promote(end, Queen)
+
+    def static_exchange(self, chess_board, move):
+        return chess_board.static_exchange(move)
+
+    def move_info(self, chess_board, move):
+        # (packed, victim type, attacker type, promotion type) of a
+        # ChessBoard move, as used by move ordering
+        start, end = move
+        piece = chess_board.board[start[0]][start[1]]
+        target = chess_board.board[end[0]][end[1]]
+        victim = None if target is None else PIECE_CODES[target.symbol]
+        promotion = None
+        if isinstance(piece, Pawn):
+            if victim is None and start[1] != end[1]:
+                victim = PAWN  # En passant
+            if end[0] == 0 or end[0] == 7:
+                promotion = QUEEN
+        return pack_move(start[0] * 8 + start[1], end[0] * 8 + end[1]), victim, PIECE_CODES[piece.symbol], promotion
+
+    def order_moves(self, board, moves, hash_move, depth, color):
+        infos = [self.move_info(board, move) for move in moves]
+        return self.move_ordering.order(moves, infos, hash_move, self.root_depth - depth, COLOR_INDEX[color])
+
+    def record_cutoff(self, board, move, index, depth, color):
+        self.stats.beta_cutoffs += 1
+        if index == 0:
+            self.stats.first_move_cutoffs += 1
+        self.move_ordering.record_cutoff(self.move_info(board, move), self.root_depth - depth, depth, COLOR_INDEX[color])
+
     def evaluate_board(self, chess_board):
+        stats = self.stats
+        start = perf_counter()
+        stats.leaf_evaluations += 1
+        stats.cache_probes += 1
         # Check if the board state is cached
-        board_state = tuple(tuple(row) for row in chess_board.board)
-        if board_state in self.evaluation_cache:
-            return self.evaluation_cache[board_state]
-
-        # Use the provided evaluation function
-        value = self.evaluation_function(chess_board, self.color)
+        board_state = chess_board.zobrist_key
+        value = self.evaluation_cache.get(board_state)
+        if value is not None:
+            stats.cache_hits += 1
+        else:
+            # Use the provided evaluation function
+            value = self.evaluation_function(chess_board, self.color)
 
-        # Cache the evaluation
-        self.evaluation_cache[board_state] = value
+            # Cache the evaluation
+            self.evaluation_cache.put(board_state, value)
+        stats.evaluation_time += perf_counter() - start
         return value
 
     def get_all_possible_moves(self, chess_board, color):
-        moves = []
-        for row in range(8):
-            for col in range(8):
-                piece = chess_board.board[row][col]
-                if piece and piece.color == color:
-                    valid_moves = chess_board.get_valid_moves((row, col))
-                    for move in valid_moves:
-                        # Simulate the move
-                        original_piece = chess_board.board[move[0]][move[1]]
-                        chess_board.board[move[0]][move[1]] = piece
-                        chess_board.board[row][col] = None
-                        in_check = chess_board.is_in_check(color)
-                        # Undo the move
-                        chess_board.board[row][col] = piece
-                        chess_board.board[move[0]][move[1]] = original_piece
-                        if not in_check:
-                            moves.append(((row, col), move))
-        return moves
\ No newline at end of file
+        return chess_board.get_legal_moves(color)
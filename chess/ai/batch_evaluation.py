@@ -0,0 +1,94 @@
+# Vectorised evaluation of many positions at once with NumPy.
+#
+# Positions are stacked as uint8[N, 64] arrays holding piece code + 1 per
+# square (0 for empty) in the bitboard orientation, row * 8 + col with row 0
+# being rank 8. Scores cover material, piece-square tables, pawn structure
+# and centre control; king safety and piece activity need move generation
+# and are left to advanced_evaluation.
+import numpy as np
+
+from chess.psqt import MATERIAL, PSQT
+from chess.ai.pawn_structure import DOUBLED_PAWN_PENALTY, ISOLATED_PAWN_PENALTY, PASSED_PAWN_BONUS
+
+EMPTY = 0
+
+# Material plus piece-square value of every (piece code + 1, square) pair,
+# signed from white's point of view; row 0 is the empty square
+SQUARE_VALUES = np.zeros((13, 64), dtype=np.int32)
+SQUARE_VALUES[1:] = np.array(MATERIAL, dtype=np.int32)[:, None] + np.array(PSQT, dtype=np.int32)
+
+WHITE_PAWN_CODE, BLACK_PAWN_CODE = 1, 7
+CENTER_SQUARES = [27, 28, 35, 36]
+ROWS = np.arange(8)[None, :, None]
+
+CENTER_CONTROL_BONUS = 10
+
+def encode_position(board):
+    # One uint8[64] row from a BitboardChessBoard or ChessBoard
+    if hasattr(board, 'board_to_bitboard'):
+        board = board.board_to_bitboard()
+    return bytes(EMPTY if piece is None else piece + 1 for piece in board.mailbox)
+
+def stack_positions(encoded):
+    # uint8[N, 64] from a list of encode_position rows
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8).reshape(-1, 64)
+
+def encode_positions(boards):
+    return stack_positions([encode_position(board) for board in boards])
+
+def planes_to_squares(bitboards):
+    # uint64[N, 12] piece bitboards (as in BitboardChessBoard.bitboards) to
+    # uint8[N, 64] squares; a bit b of a bitboard is square b
+    bitboards = np.ascontiguousarray(bitboards, dtype='<u8')
+    planes = np.unpackbits(bitboards.view(np.uint8), axis=-1, bitorder='little')
+    planes = planes.reshape(len(bitboards), 12, 64)
+    codes = np.arange(1, 13, dtype=np.uint8)[None, :, None]
+    return (planes * codes).max(axis=1).astype(np.uint8)
+
+def pawn_structure_scores(squares):
+    # Doubled, isolated and passed pawns, white minus black, per position
+    board = squares.reshape(-1, 8, 8)
+    white = board == WHITE_PAWN_CODE
+    black = board == BLACK_PAWN_CODE
+    scores = np.zeros(len(squares), dtype=np.int32)
+
+    for pawns, sign in ((white, 1), (black, -1)):
+        files = pawns.sum(axis=1)
+        neighbours = np.zeros_like(files)
+        neighbours[:, 1:] += files[:, :-1]
+        neighbours[:, :-1] += files[:, 1:]
+        doubled = np.maximum(files - 1, 0).sum(axis=1)
+        isolated = (files * (neighbours == 0)).sum(axis=1)
+        scores += sign * (-DOUBLED_PAWN_PENALTY * doubled - ISOLATED_PAWN_PENALTY * isolated)
+
+    # White pawns advance towards row 0, so a white pawn is passed when no
+    # black pawn stands on a lower row of its own or an adjacent file
+    black_front = np.where(black, ROWS, 8).min(axis=1)
+    white_front = np.where(white, ROWS, -1).max(axis=1)
+    black_span = black_front.copy()
+    black_span[:, 1:] = np.minimum(black_span[:, 1:], black_front[:, :-1])
+    black_span[:, :-1] = np.minimum(black_span[:, :-1], black_front[:, 1:])
+    white_span = white_front.copy()
+    white_span[:, 1:] = np.maximum(white_span[:, 1:], white_front[:, :-1])
+    white_span[:, :-1] = np.maximum(white_span[:, :-1], white_front[:, 1:])
+    white_passed = (white & (ROWS <= black_span[:, None, :])).sum(axis=(1, 2))
+    black_passed = (black & (ROWS >= white_span[:, None, :])).sum(axis=(1, 2))
+    scores += PASSED_PAWN_BONUS * (white_passed - black_passed)
+    return scores
+
+def center_control_scores(squares):
+    center = squares[:, CENTER_SQUARES].astype(np.int32)
+    white = ((center >= 1) & (center <= 6)).sum(axis=1)
+    black = (center >= 7).sum(axis=1)
+    return CENTER_CONTROL_BONUS * (white - black)
+
+def evaluate_batch(squares, color='white'):
+    # int32[N] scores from color's point of view
+    squares = np.asarray(squares, dtype=np.uint8).reshape(-1, 64)
+    scores = SQUARE_VALUES[squares, np.arange(64)].sum(axis=1, dtype=np.int32)
+    scores += pawn_structure_scores(squares)
+    scores += center_control_scores(squares)
+    return scores if color == 'white' else -scores
+
+def evaluate_boards(boards, color='white'):
+    return evaluate_batch(encode_positions(boards), color)
@@ -0,0 +1,190 @@
+# Headless search benchmark for the AIs.
+#
+# Each engine searches a fixed set of positions either at fixed depths or
+# under a time budget, recording nodes, nodes per second, time-to-depth,
+# cache hit rates and peak memory. Results are written as JSON and can be
+# checked against a stored baseline:
+#
+#     python -m chess.ai.benchmark --depth 2 --json baseline.json
+#     python -m chess.ai.benchmark --depth 2 --baseline baseline.json --threshold 0.15
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from chess.chess_board import ChessBoard
+from chess.ai.random_ai import RandomAI
+from chess.ai.minimax_ai import MinimaxAI
+from chess.ai.minimax_bit_ai import MinimaxBitAI
+from chess.ai.pawn_structure import pawn_cache
+
+ENGINES = {
+    'random': lambda color, depth, time_limit, on_iteration: RandomAI(color, on_iteration=on_iteration),
+    'minimax': lambda color, depth, time_limit, on_iteration: MinimaxAI(
+        color, depth=depth, time_limit=time_limit, on_iteration=on_iteration),
+    'minimax_bit': lambda color, depth, time_limit, on_iteration: MinimaxBitAI(
+        color, depth=depth, time_limit=time_limit, on_iteration=on_iteration),
+    # Without null-move pruning and late-move reductions, to measure what
+    # they save and compare the moves chosen
+    'minimax_bit_full_width': lambda color, depth, time_limit, on_iteration: MinimaxBitAI(
+        color, depth=depth, time_limit=time_limit, on_iteration=on_iteration,
+        null_move=False, late_move_reductions=False),
+}
+
+BENCHMARK_POSITIONS = [
+    ('initial', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'),
+    ('italian', 'r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4'),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'),
+    ('middlegame', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10'),
+    ('rook_endgame', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1'),
+    ('promotion', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8'),
+]
+
+def timed_search(engine, fen, depth, time_limit, trace_memory):
+    chess_board = ChessBoard.from_fen(fen)
+    time_to_depth = {}
+    record_iteration = lambda stats: time_to_depth.__setitem__(stats.depth, round(stats.elapsed, 6))
+    ai = ENGINES[engine](chess_board.side_to_move, depth, time_limit, record_iteration)
+    if trace_memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    result = ai.make_move(chess_board, chess_board.flipped)
+    seconds = time.perf_counter() - start_time
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    if hasattr(ai, 'close'):
+        ai.close()
+    stats = result.stats
+    return {
+        'depth': stats.depth,
+        'move': result.move,
+        'nodes': stats.nodes,
+        'seconds': round(seconds, 6),
+        'nps': round(stats.nodes / seconds) if seconds else None,
+        'time_to_depth': time_to_depth,
+        'leaf_evaluations': stats.leaf_evaluations,
+        'first_move_cutoff_rate': round(stats.first_move_cutoff_rate, 4),
+        # None for engines that do not cache evaluations
+        'eval_cache_hit_rate': round(stats.cache_hit_rate, 4) if stats.cache_probes else None,
+        'tt_hit_rate': round(stats.tt_hit_rate, 4),
+        'movegen_time': round(stats.movegen_time, 6),
+        'evaluation_time': round(stats.evaluation_time, 6),
+        'peak_memory_bytes': peak_memory,
+    }
+
+def benchmark_position(engine, name, fen, depth, time_budget, trace_memory):
+    # A fixed depth runs one search per depth up to it; a time budget runs a
+    # single budgeted search, whose iterations give the time-to-depth
+    if time_budget is not None:
+        runs = [timed_search(engine, fen, depth, time_budget, trace_memory)]
+        time_to_depth = runs[0]['time_to_depth']
+    else:
+        runs = [timed_search(engine, fen, search_depth, None, trace_memory)
+                for search_depth in (range(1, depth + 1) if engine != 'random' else [1])]
+        time_to_depth = {run['depth']: run['seconds'] for run in runs}
+    nodes = sum(run['nodes'] for run in runs)
+    seconds = sum(run['seconds'] for run in runs)
+    return {
+        'engine': engine,
+        'position': name,
+        'fen': fen,
+        'depth_reached': runs[-1]['depth'],
+        'time_to_depth': time_to_depth,
+        'nodes': nodes,
+        'seconds': round(seconds, 6),
+        'nps': round(nodes / seconds) if seconds else None,
+        'runs': runs,
+    }
+
+def summarize(results):
+    summary = {}
+    for result in results:
+        totals = summary.setdefault(result['engine'], {'nodes': 0, 'seconds': 0.0})
+        totals['nodes'] += result['nodes']
+        totals['seconds'] += result['seconds']
+    for totals in summary.values():
+        totals['nps'] = round(totals['nodes'] / totals['seconds']) if totals['seconds'] else None
+        totals['seconds'] = round(totals['seconds'], 6)
+    return summary
+
+def find_regressions(summary, baseline, threshold):
+    # Engines whose throughput fell more than threshold below the baseline
+    regressions = []
+    for engine, totals in summary.items():
+        previous = baseline.get('summary', {}).get(engine)
+        if not previous or not previous.get('nps') or not totals['nps']:
+            continue
+        if totals['nps'] < previous['nps'] * (1 - threshold):
+            regressions.append((engine, previous['nps'], totals['nps']))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark AI search throughput on fixed positions.")
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument('--depth', type=int, default=2, help="deepest fixed depth to search")
+    parser.add_argument('--time', type=float, metavar='SECONDS',
+                        help="give each search this time budget instead")
+    parser.add_argument('--max-depth', type=int, default=None, help="depth limit for --time")
+    parser.add_argument('--positions', nargs='+', choices=[name for name, _ in BENCHMARK_POSITIONS])
+    parser.add_argument('--trace-memory', action='store_true', help="record peak allocations (slower)")
+    parser.add_argument('--json', metavar='PATH', help="write results as JSON")
+    parser.add_argument('--baseline', metavar='PATH', help="compare against an earlier --json report")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="allowed fractional NPS drop against the baseline")
+    args = parser.parse_args(argv)
+
+    mode = 'depth' if args.time is None else 'time'
+    depth = args.depth if args.time is None else args.max_depth
+    positions = [(name, fen) for name, fen in BENCHMARK_POSITIONS if not args.positions or name in args.positions]
+
+    results = []
+    for engine in args.engines:
+        for name, fen in positions:
+            result = benchmark_position(engine, name, fen, depth, args.time, args.trace_memory)
+            results.append(result)
+            print(f"{engine} {name}: depth {result['depth_reached']}, {result['nodes']} nodes "
+                  f"in {result['seconds']:.3f}s ({result['nps'] or 0} nps)")
+
+    summary = summarize(results)
+    for engine, totals in summary.items():
+        print(f"{engine}: {totals['nodes']} nodes in {totals['seconds']:.3f}s ({totals['nps'] or 0} nps)")
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'mode': mode,
+        'depth': args.depth if mode == 'depth' else None,
+        'time': args.time,
+        'pawn_cache': pawn_cache.stats(),
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+        'summary': summary,
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if (baseline.get('mode'), baseline.get('depth'), baseline.get('time')) != (mode, report['depth'], args.time):
+            print("Baseline was recorded with different settings; throughput is not comparable")
+            return 1
+        regressions = find_regressions(summary, baseline, args.threshold)
+        for engine, previous, current in regressions:
+            print(f"Regression: {engine} {current} nps against baseline {previous} nps")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,344 @@
+# Endgame bitbases: win/draw/loss tables for 3- and 4-man endings.
+#
+# Tables are generated offline by retrograde analysis on BitboardChessBoard
+# and written as one file per material balance, e.g. KRvK.bb for king and
+# rook against king. Each position has a 2-bit result for the side to move,
+# four to a byte, optionally followed by one byte per position giving the
+# distance to mate in plies. Probes memory-map the files and read the entry
+# for a position directly, so search can stop at any position the tables
+# cover:
+#
+#     python -m chess.ai.bitbases KQvK KRvK KPvK --dir bitbases
+#
+# Positions are indexed by side to move and the square of each piece, so a
+# table holds 2 * 64 ** pieces entries (128 KB for three men, 8 MB for four)
+# with no symmetry folding. Castling and en passant are not represented.
+# Generation in Python takes a minute or two for a three-man table and,
+# with 64 times the positions, around an hour and a half for a four-man
+# one before its dependencies.
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+from chess.bitboard import BitboardChessBoard, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, COLORS, PIECE_SYMBOLS
+from chess.attacks import KNIGHT_ATTACKS, KING_ATTACKS, bishop_attacks, rook_attacks, queen_attacks
+from chess.psqt import PIECE_VALUES
+
+# Results for the side to move
+DRAW, WIN, LOSS, INVALID = range(4)
+
+HEADER = struct.Struct('<4sBB10s')  # magic, flags, piece count, material name
+MAGIC = b'BBS1'
+HAS_DTM = 1
+MAX_DTM = 255
+
+PIECE_ORDER = 'KQRBNP'
+INSUFFICIENT_MATERIAL = {'KvK', 'KBvK', 'KvKB', 'KNvK', 'KvKN'}
+
+def parse_material(name):
+    # Piece codes of a material name, white's pieces first
+    white, black = name.upper().split('V')
+    return ([PIECE_SYMBOLS.index(letter) for letter in white]
+            + [PIECE_SYMBOLS.index(letter) + 6 for letter in black])
+
+def side_material(bitboards, first_code):
+    return ''.join(letter * bin(bitboards[first_code + PIECE_SYMBOLS.index(letter)]).count('1')
+                   for letter in PIECE_ORDER)
+
+def material_name(bitboard):
+    return side_material(bitboard.bitboards, 0) + 'v' + side_material(bitboard.bitboards, 6)
+
+def flipped_name(name):
+    white, black = name.split('v')
+    return black + 'v' + white
+
+def canonical_name(name):
+    # Tables are stored with the side with more material as white
+    value = lambda side: sum(PIECE_VALUES[PIECE_SYMBOLS.index(letter)] for letter in side if letter != 'K')
+    white, black = name.split('v')
+    if (value(white), white) >= (value(black), black):
+        return name
+    return flipped_name(name)
+
+def position_index(bitboards, pieces, side, flip=False):
+    # Index of a position in the table for pieces; flip reads a position
+    # with the colours swapped and the board mirrored top to bottom
+    index = side ^ flip
+    taken = {}
+    for piece in pieces:
+        code = (piece + 6) % 12 if flip else piece
+        squares = bitboards[code] & ~taken.get(code, 0)
+        square = (squares & -squares).bit_length() - 1
+        taken[code] = taken.get(code, 0) | (1 << square)
+        index = index * 64 + (square ^ 56 if flip else square)
+    return index
+
+def decode_index(index, count):
+    squares = []
+    for _ in range(count):
+        index, square = divmod(index, 64)
+        squares.append(square)
+    return index, squares[::-1]
+
+class Bitbase:
+    # One memory-mapped table file
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as table_file:
+            self.data = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, flags, count, name = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a bitbase file")
+        self.name = name.rstrip(b'\0').decode('ascii')
+        self.pieces = parse_material(self.name)
+        self.size = 2 * 64 ** count
+        self.has_dtm = bool(flags & HAS_DTM)
+        self.dtm_offset = HEADER.size + (self.size + 3) // 4
+
+    def close(self):
+        self.data.close()
+
+    def result(self, index):
+        return (self.data[HEADER.size + (index >> 2)] >> ((index & 3) * 2)) & 3
+
+    def distance(self, index):
+        return self.data[self.dtm_offset + index] if self.has_dtm else 0
+
+class Bitbases:
+    # The tables found in a directory, probed by the material of a position
+
+    def __init__(self, directory):
+        if not os.path.isdir(directory):
+            raise ValueError(f"{directory} is not a bitbase directory")
+        self.tables = {}
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.bb'):
+                table = Bitbase(os.path.join(directory, filename))
+                self.tables[table.name] = table
+        self.max_pieces = max((len(table.pieces) for table in self.tables.values()), default=2)
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+
+    def add(self, table):
+        self.tables[table.name] = table
+        self.max_pieces = max(self.max_pieces, len(table.pieces))
+
+    def probe(self, bitboard):
+        # (result, distance to mate in plies) for the side to move, or None
+        # when no table covers the position
+        if bitboard.castling_rights or bin(bitboard.occupied).count('1') > self.max_pieces:
+            return None
+        name = material_name(bitboard)
+        if name in INSUFFICIENT_MATERIAL:
+            return DRAW, 0
+        side = COLORS.index(bitboard.side_to_move)
+        table = self.tables.get(name)
+        flip = False
+        if table is None:
+            table = self.tables.get(flipped_name(name))
+            flip = True
+            if table is None:
+                return None
+        index = position_index(bitboard.bitboards, table.pieces, side, flip)
+        return table.result(index), table.distance(index)
+
+def unmove_targets(bitboard, piece, square):
+    # Squares the piece on square could have come from without capturing
+    piece_type = piece % 6
+    empty = ~bitboard.occupied
+    if piece_type == KNIGHT:
+        return KNIGHT_ATTACKS[square] & empty
+    if piece_type == BISHOP:
+        return bishop_attacks(square, bitboard.occupied) & empty
+    if piece_type == ROOK:
+        return rook_attacks(square, bitboard.occupied) & empty
+    if piece_type == QUEEN:
+        return queen_attacks(square, bitboard.occupied) & empty
+    if piece_type == KING:
+        return KING_ATTACKS[square] & empty
+    # Pawns step back towards their own side, two squares from the fourth rank
+    behind, double_row = (8, 4) if piece < 6 else (-8, 3)
+    origin = square + behind
+    if not 0 < origin // 8 < 7 or not empty & (1 << origin):
+        return 0
+    targets = 1 << origin
+    if square // 8 == double_row and empty & (1 << (origin + behind)):
+        targets |= 1 << (origin + behind)
+    return targets
+
+def generate(name, directory, store_dtm=True, tables=None, log=print):
+    # Build the table for a material balance, and first every table its
+    # captures and promotions lead to. Returns the Bitbases that hold them
+    name = canonical_name(name)
+    if tables is None:
+        os.makedirs(directory, exist_ok=True)
+        tables = Bitbases(directory)
+    if name in tables.tables or name in INSUFFICIENT_MATERIAL:
+        return tables
+    pieces = parse_material(name)
+    for dependency in dependencies(pieces):
+        generate(dependency, directory, store_dtm, tables, log)
+
+    start_time = time.perf_counter()
+    count = len(pieces)
+    size = 2 * 64 ** count
+    results = bytearray(size)  # DRAW until proven otherwise
+    distances = bytearray(size)
+    remaining = bytearray(size)  # Moves not yet known to lose for the mover
+    escapes = bytearray(size)  # 1 if a conversion reaches a draw or better
+    floor = bytearray(size)  # Longest known conversion into a lost position
+    buckets = {}
+    board = BitboardChessBoard(empty=True)
+
+    # Forward pass: every legal position's moves, with captures and
+    # promotions resolved from the smaller tables
+    for index in range(size):
+        side, squares = decode_index(index, count)
+        if not placeable(pieces, squares):
+            results[index] = INVALID
+            continue
+        for piece, square in zip(pieces, squares):
+            board.set_piece(piece, square)
+        board.side_to_move = COLORS[side]
+        if board.is_in_check(COLORS[1 - side]):
+            results[index] = INVALID
+        else:
+            moves = board.generate_legal_moves(COLORS[side])
+            if not moves:
+                if board.is_in_check(COLORS[side]):
+                    buckets.setdefault(0, []).append((index, LOSS))
+            for move in moves:
+                board.update_board(*move)
+                if len(move) == 3 or board.move_history[-1][3] is not None:
+                    result, distance = tables.probe(board)
+                    if result == WIN:
+                        floor[index] = max(floor[index], min(distance + 1, MAX_DTM))
+                    else:
+                        escapes[index] = 1
+                        if result == LOSS:
+                            buckets.setdefault(distance + 1, []).append((index, WIN))
+                else:
+                    remaining[index] += 1
+                board.undo_move()
+            if moves and not remaining[index] and not escapes[index]:
+                buckets.setdefault(floor[index], []).append((index, LOSS))
+        for piece, square in zip(pieces, squares):
+            board.clear_piece(piece, square)
+
+    # Backward pass in order of distance: a loss makes its predecessors wins,
+    # and a position whose every move reaches a win for the other side is lost
+    distance = 0
+    while buckets:
+        for index, result in buckets.pop(distance, []):
+            if results[index] != DRAW or remaining[index] == 255:
+                continue
+            results[index] = result
+            distances[index] = min(distance, MAX_DTM)
+            remaining[index] = 255  # Resolved
+            for predecessor in predecessors(board, pieces, index):
+                if remaining[predecessor] == 255 or results[predecessor] != DRAW:
+                    continue
+                if result == LOSS:
+                    buckets.setdefault(distance + 1, []).append((predecessor, WIN))
+                else:
+                    remaining[predecessor] -= 1
+                    if not remaining[predecessor] and not escapes[predecessor]:
+                        buckets.setdefault(max(distance + 1, floor[predecessor]), []).append((predecessor, LOSS))
+        distance += 1
+
+    path = os.path.join(directory, name + '.bb')
+    write_table(path, name, results, distances if store_dtm else None)
+    tables.add(Bitbase(path))
+    log(f"{name}: {size} positions in {time.perf_counter() - start_time:.1f}s")
+    return tables
+
+def placeable(pieces, squares):
+    # Distinct squares, no pawn on the first or last rank, and identical
+    # pieces in ascending square order so each position has one index
+    if len(set(squares)) != len(squares):
+        return False
+    previous = {}
+    for piece, square in zip(pieces, squares):
+        if piece % 6 == PAWN and square // 8 in (0, 7):
+            return False
+        if previous.get(piece, -1) > square:
+            return False
+        previous[piece] = square
+    return True
+
+def predecessors(board, pieces, index):
+    # Indexes of the positions from which a quiet move leads to index
+    side, squares = decode_index(index, len(pieces))
+    mover = 1 - side
+    for piece, square in zip(pieces, squares):
+        board.set_piece(piece, square)
+    found = []
+    for piece, square in zip(pieces, squares):
+        if piece // 6 != mover:
+            continue
+        targets = unmove_targets(board, piece, square)
+        while targets:
+            origin = targets.bit_length() - 1
+            targets &= ~(1 << origin)
+            board.move_piece(piece, square, origin)
+            # The side now to move cannot have been left in check
+            if not board.is_in_check(COLORS[side]):
+                found.append(position_index(board.bitboards, pieces, mover))
+            board.move_piece(piece, origin, square)
+    for piece, square in zip(pieces, squares):
+        board.clear_piece(piece, square)
+    return found
+
+def dependencies(pieces):
+    # Material balances reachable by one capture or promotion
+    names = set()
+    for position, piece in enumerate(pieces):
+        rest = pieces[:position] + pieces[position + 1:]
+        if piece % 6 != KING:
+            names.add(pieces_name(rest))
+        if piece % 6 == PAWN:
+            for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                names.add(pieces_name(rest + [piece - PAWN + promotion]))
+    return sorted(names)
+
+def pieces_name(pieces):
+    sides = ['', '']
+    for letter in PIECE_ORDER:
+        for piece in pieces:
+            if PIECE_SYMBOLS[piece].upper() == letter:
+                sides[piece // 6] += letter
+    return canonical_name(sides[0] + 'v' + sides[1])
+
+def write_table(path, name, results, distances=None):
+    packed = bytearray((len(results) + 3) // 4)
+    for index, result in enumerate(results):
+        if result:
+            packed[index >> 2] |= result << ((index & 3) * 2)
+    count = len(parse_material(name))
+    with open(path, 'wb') as table_file:
+        table_file.write(HEADER.pack(MAGIC, HAS_DTM if distances is not None else 0, count, name.encode('ascii')))
+        table_file.write(packed)
+        if distances is not None:
+            table_file.write(distances)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate endgame bitbases by retrograde analysis.")
+    parser.add_argument('materials', nargs='+', help="material balances such as KRvK or KPvK")
+    parser.add_argument('--dir', default='bitbases', help="directory for the table files")
+    parser.add_argument('--no-dtm', action='store_true', help="store win/draw/loss only")
+    args = parser.parse_args(argv)
+    tables = None
+    for name in args.materials:
+        if len(parse_material(name)) > 4:
+            parser.error(f"{name}: only tables of up to four pieces are supported")
+        tables = generate(name, args.dir, not args.no_dtm, tables)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
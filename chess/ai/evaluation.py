@@ -1,3 +1,5 @@
+from chess.ai.pawn_structure import cached_pawn_structure_score
+
 def basic_material_evaluation(chess_board, color):
     piece_values = {
         'P': 1, 'N': 3, 'B': 3, 'R': 5, 'Q': 9, 'K': 0
@@ -11,83 +13,10 @@ def basic_material_evaluation(chess_board, color):
     return value
 
 def advanced_evaluation(chess_board, color):
-    piece_values = {
-        'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 20000
-    }
-    position_values = {
-        'P': [
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [5, 10, 10, -20, -20, 10, 10, 5],
-            [5, -5, -10, 0, 0, -10, -5, 5],
-            [0, 0, 0, 20, 20, 0, 0, 0],
-            [5, 5, 10, 25, 25, 10, 5, 5],
-            [10, 10, 20, 30, 30, 20, 10, 10],
-            [50, 50, 50, 50, 50, 50, 50, 50],
-            [0, 0, 0, 0, 0, 0, 0, 0]
-        ],
-        'N': [
-            [-50, -40, -30, -30, -30, -30, -40, -50],
-            [-40, -20, 0, 0, 0, 0, -20, -40],
-            [-30, 0, 10, 15, 15, 10, 0, -30],
-            [-30, 5, 15, 20, 20, 15, 5, -30],
-            [-30, 0, 15, 20, 20, 15, 0, -30],
-            [-30, 5, 10, 15, 15, 10, 5, -30],
-            [-40, -20, 0, 5, 5, 0, -20, -40],
-            [-50, -40, -30, -30, -30, -30, -40, -50]
-        ],
-        'B': [
-            [-20, -10, -10, -10, -10, -10, -10, -20],
-            [-10, 0, 0, 0, 0, 0, 0, -10],
-            [-10, 0, 5, 10, 10, 5, 0, -10],
-            [-10, 5, 5, 10, 10, 5, 5, -10],
-            [-10, 0, 10, 10, 10, 10, 0, -10],
-            [-10, 10, 10, 10, 10, 10, 10, -10],
-            [-10, 5, 0, 0, 0, 0, 5, -10],
-            [-20, -10, -10, -10, -10, -10, -10, -20]
-        ],
-        'R': [
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [5, 10, 10, 10, 10, 10, 10, 5],
-            [-5, 0, 0, 0, 0, 0, 0, -5],
-            [-5, 0, 0, 0, 0, 0, 0, -5],
-            [-5, 0, 0, 0, 0, 0, 0, -5],
-            [-5, 0, 0, 0, 0, 0, 0, -5],
-            [-5, 0, 0, 0, 0, 0, 0, -5],
-            [0, 0, 0, 5, 5, 0, 0, 0]
-        ],
-        'Q': [
-            [-20, -10, -10, -5, -5, -10, -10, -20],
-            [-10, 0, 0, 0, 0, 0, 0, -10],
-            [-10, 0, 5, 5, 5, 5, 0, -10],
-            [-5, 0, 5, 5, 5, 5, 0, -5],
-            [0, 0, 5, 5, 5, 5, 0, -5],
-            [-10, 5, 5, 5, 5, 5, 0, -10],
-            [-10, 0, 5, 0, 0, 0, 0, -10],
-            [-20, -10, -10, -5, -5, -10, -10, -20]
-        ],
-        'K': [
-            [20, 30, 10, 0, 0, 10, 30, 20],
-            [20, 20, 0, 0, 0, 0, 20, 20],
-            [-10, -20, -20, -20, -20, -20, -20, -10],
-            [-20, -30, -30, -40, -40, -30, -30, -20],
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-30, -40, -40, -50, -50, -40, -40, -30]
-        ]
-    }
-
-    value = 0
-    for row in range(8):
-        for col in range(8):
-            piece = chess_board.board[row][col]
-            if piece:
-                piece_value = piece_values[piece.symbol.upper()]
-                position_value = position_values[piece.symbol.upper()][row][col]
-                if piece.color == color:
-                    value += piece_value + position_value
-                else:
-                    value -= piece_value + position_value
+    # Material and piece-square scores are running totals kept by the board
+    value = chess_board.material_score + chess_board.psqt_score
+    if color == 'black':
+        value = -value
 
     # Additional factors
     value += evaluate_king_safety(chess_board, color)
@@ -124,24 +53,9 @@ def evaluate_king_safety(chess_board, color):
     return safety_score
 
 def evaluate_pawn_structure(chess_board, color):
-    pawn_score = 0
-    pawn_positions = [(r, c) for r in range(8) for c in range(8) if chess_board.board[r][c] and chess_board.board[r][c].symbol.lower() == 'p' and chess_board.board[r][c].color == color]
-
-    # Evaluate doubled, isolated, and passed pawns
-    for row, col in pawn_positions:
-        # Doubled pawns
-        if any(chess_board.board[r][col] and chess_board.board[r][col].symbol.lower() == 'p' and chess_board.board[r][col].color == color for r in range(row + 1, 8)):
-            pawn_score -= 10
-
-        # Isolated pawns
-        if not any(chess_board.board[row][c] and chess_board.board[row][c].symbol.lower() == 'p' and chess_board.board[row][c].color == color for c in [col - 1, col + 1] if 0 <= c < 8):
-            pawn_score -= 10
-
-        # Passed pawns
-        if not any(chess_board.board[r][col] and chess_board.board[r][col].symbol.lower() == 'p' and chess_board.board[r][col].color != color for r in range(row + 1, 8)):
-            pawn_score += 20
-
-    return pawn_score
+    # Doubled, isolated and passed pawns of both sides, cached by pawn key
+    pawn_score = cached_pawn_structure_score(chess_board)
+    return pawn_score if color == 'white' else -pawn_score
 
 def evaluate_piece_activity(chess_board, color):
     activity_score = 0
@@ -0,0 +1,49 @@
+from array import array
+
+class EvaluationCache:
+    # Direct-mapped cache of evaluations keyed by Zobrist key: each key has
+    # exactly one slot, so a colliding store simply evicts the old entry and
+    # memory stays fixed at max_entries slots however long the AI lives
+
+    def __init__(self, max_entries=1 << 16):
+        self.size = 1 << (max(1, max_entries).bit_length() - 1)
+        self.mask = self.size - 1
+        self.clear()
+
+    def clear(self):
+        self.keys = array('Q', bytes(8 * self.size))
+        self.values = array('d', bytes(8 * self.size))
+        self.filled = bytearray(self.size)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        index = key & self.mask
+        if self.filled[index] and self.keys[index] == key:
+            self.hits += 1
+            return self.values[index]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        index = key & self.mask
+        if self.filled[index] and self.keys[index] != key:
+            self.evictions += 1
+        self.keys[index] = key
+        self.values[index] = value
+        self.filled[index] = 1
+
+    def __len__(self):
+        return sum(self.filled)
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'capacity': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / probes if probes else 0.0,
+        }
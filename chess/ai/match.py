@@ -0,0 +1,436 @@
+# Headless engine-vs-engine matches.
+#
+# Two engines from the benchmark table play each other from a set of
+# openings, each opening twice with colours reversed, across a pool of
+# worker processes. Games end on mate, stalemate, threefold repetition, the
+# fifty-move rule, insufficient material or a ply limit. Finished games are
+# written as PGN and the running score is reported as Elo with a 95% error
+# bar and a sequential probability ratio test (SPRT) between two Elo
+# hypotheses:
+#
+#     python -m chess.ai.match minimax_bit minimax_bit_full_width --games 1000 --time 0.02 --pgn match.pgn
+#
+# With --stop-on-sprt the match ends as soon as the SPRT accepts either
+# hypothesis.
+import argparse
+import concurrent.futures
+import math
+import os
+import sys
+import time
+
+from chess.bitboard import SQUARE_NAMES, ONGOING, CHECKMATE, STALEMATE
+from chess.chess_board import ChessBoard
+from chess.epd import iter_records
+from chess.pieces import Pawn, King, Knight, Bishop, Queen, Rook
+from chess.ai.benchmark import ENGINES
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Short, balanced lines in long algebraic notation, played from the start
+# position before the engines take over
+OPENINGS = [
+    'e2e4 e7e5 g1f3 b8c6 f1b5 a7a6',
+    'e2e4 e7e5 g1f3 b8c6 f1c4 f8c5',
+    'e2e4 c7c5 g1f3 d7d6 d2d4 c5d4',
+    'e2e4 c7c5 b1c3 b8c6 g2g3 g7g6',
+    'e2e4 e7e6 d2d4 d7d5 b1c3 g8f6',
+    'e2e4 c7c6 d2d4 d7d5 e4e5 c8f5',
+    'd2d4 d7d5 c2c4 e7e6 b1c3 g8f6',
+    'd2d4 d7d5 c2c4 c7c6 g1f3 g8f6',
+    'd2d4 g8f6 c2c4 g7g6 b1c3 f8g7',
+    'd2d4 g8f6 c2c4 e7e6 g1f3 b7b6',
+    'c2c4 e7e5 b1c3 g8f6 g1f3 b8c6',
+    'g1f3 d7d5 g2g3 g8f6 f1g2 c7c6',
+]
+
+PROMOTION_CLASSES = {'q': Queen, 'r': Rook, 'b': Bishop, 'n': Knight}
+SQUARE_INDEXES = {name: index for index, name in enumerate(SQUARE_NAMES)}
+
+FIFTY_MOVE_PLIES = 100
+IN_FLIGHT_PER_WORKER = 2
+
+# Per-process engines, reused across games and reset between them
+worker_settings = None
+worker_engines = {}
+
+def init_match_worker(depth, time_limit):
+    global worker_settings
+    worker_settings = (depth, time_limit)
+    worker_engines.clear()
+
+def worker_engine(engine, color):
+    ai = worker_engines.get((engine, color))
+    if ai is None:
+        depth, time_limit = worker_settings
+        ai = worker_engines[engine, color] = ENGINES[engine](color, depth, time_limit, None)
+    return ai
+
+def parse_uci(chess_board, text):
+    # ((row, col), (row, col)) and promotion class of a long algebraic move
+    start = chess_board.square_position(SQUARE_INDEXES[text[0:2]])
+    end = chess_board.square_position(SQUARE_INDEXES[text[2:4]])
+    return (start, end), PROMOTION_CLASSES.get(text[4:5])
+
+def san(chess_board, move, promotion, legal_moves):
+    # Standard algebraic name of a legal move, before it is played; the
+    # check suffix is added by the caller once the reply status is known
+    start, end = move
+    piece = chess_board.board[start[0]][start[1]]
+    start_name = SQUARE_NAMES[chess_board.square_index(*start)]
+    end_name = SQUARE_NAMES[chess_board.square_index(*end)]
+    if isinstance(piece, King) and abs(start[1] - end[1]) == 2:
+        return 'O-O' if end_name[0] == 'g' else 'O-O-O'
+    capture = chess_board.board[end[0]][end[1]] is not None
+    if isinstance(piece, Pawn):
+        capture = capture or start[1] != end[1]
+        name = (start_name[0] + 'x' if capture else '') + end_name
+        if end[0] in (0, 7):
+            name += '=' + (promotion or Queen).symbol
+        return name
+    # Disambiguate by file, then rank, then both
+    rivals = [SQUARE_NAMES[chess_board.square_index(*other_start)] for other_start, other_end in legal_moves
+              if other_end == end and other_start != start
+              and type(chess_board.board[other_start[0]][other_start[1]]) is type(piece)]
+    prefix = ''
+    if rivals:
+        if all(rival[0] != start_name[0] for rival in rivals):
+            prefix = start_name[0]
+        elif all(rival[1] != start_name[1] for rival in rivals):
+            prefix = start_name[1]
+        else:
+            prefix = start_name
+    return piece.symbol + prefix + ('x' if capture else '') + end_name
+
+def insufficient_material(chess_board):
+    # Bare kings, or a single minor piece against a bare king
+    minors = 0
+    for row in chess_board.board:
+        for piece in row:
+            if piece is None or isinstance(piece, King):
+                continue
+            if not isinstance(piece, (Knight, Bishop)):
+                return False
+            minors += 1
+    return minors <= 1
+
+def fen_counters(fen):
+    fields = fen.split()
+    halfmove = int(fields[4]) if len(fields) > 4 else 0
+    fullmove = int(fields[5]) if len(fields) > 5 else 1
+    return halfmove, fullmove
+
+def play_game(round_number, white, black, fen, opening_moves, max_plies):
+    # One game between two engines by name. Returns the result, how the game
+    # ended, its PGN and the search effort of each side
+    chess_board = ChessBoard.from_fen(fen)
+    halfmove_clock, fullmove = fen_counters(fen)
+    players = {'white': white, 'black': black}
+    engines = {color: worker_engine(engine, color) for color, engine in players.items()}
+    for ai in engines.values():
+        ai.new_game()
+    effort = {color: {'nodes': 0, 'seconds': 0.0, 'moves': 0, 'depth': 0} for color in players}
+    repetitions = {chess_board.zobrist_key: 1}
+    first_side = chess_board.side_to_move
+    sans = []
+    opening_moves = list(opening_moves)
+    result = termination = None
+    plies = 0
+    while result is None:
+        color = chess_board.side_to_move
+        status = chess_board.get_status(color)
+        if status.result == CHECKMATE:
+            result = '0-1' if color == 'white' else '1-0'
+            termination = 'checkmate'
+            break
+        if status.result == STALEMATE:
+            result, termination = '1/2-1/2', 'stalemate'
+            break
+        if opening_moves:
+            move, promotion = parse_uci(chess_board, opening_moves.pop(0))
+        else:
+            if plies >= max_plies:
+                result, termination = '1/2-1/2', 'ply limit'
+                break
+            search = engines[color].make_move(chess_board, chess_board.flipped)
+            move, promotion = search
+            totals = effort[color]
+            totals['nodes'] += search.stats.nodes
+            totals['seconds'] += search.stats.elapsed
+            totals['depth'] += search.stats.depth
+            totals['moves'] += 1
+        if move not in status.moves:
+            # An engine that returns an illegal move forfeits the game
+            result = '0-1' if color == 'white' else '1-0'
+            termination = 'illegal move'
+            break
+
+        start, end = move
+        piece = chess_board.board[start[0]][start[1]]
+        name = san(chess_board, move, promotion, status.moves)
+        irreversible = isinstance(piece, Pawn) or chess_board.board[end[0]][end[1]] is not None
+        chess_board.update_board(move)
+        if isinstance(piece, Pawn) and end[0] in (0, 7):
+            chess_board.promote(end, promotion or Queen)
+        plies += 1
+        halfmove_clock = 0 if irreversible else halfmove_clock + 1
+        reply = chess_board.get_status(chess_board.side_to_move)
+        if reply.result == CHECKMATE:
+            name += '#'
+        elif reply.in_check:
+            name += '+'
+        sans.append(name)
+
+        if reply.result != ONGOING:
+            continue
+        key = chess_board.zobrist_key
+        repetitions[key] = repetitions.get(key, 0) + 1
+        if repetitions[key] >= 3:
+            result, termination = '1/2-1/2', 'threefold repetition'
+        elif halfmove_clock >= FIFTY_MOVE_PLIES:
+            result, termination = '1/2-1/2', 'fifty-move rule'
+        elif insufficient_material(chess_board):
+            result, termination = '1/2-1/2', 'insufficient material'
+
+    headers = [
+        ('Event', f"{white} vs {black}"),
+        ('Site', '?'),
+        ('Date', time.strftime('%Y.%m.%d')),
+        ('Round', str(round_number)),
+        ('White', white),
+        ('Black', black),
+        ('Result', result),
+    ]
+    if fen != START_FEN:
+        headers += [('SetUp', '1'), ('FEN', fen)]
+    headers += [('PlyCount', str(len(sans))), ('Termination', termination)]
+    return {
+        'round': round_number,
+        'white': white,
+        'black': black,
+        'result': result,
+        'termination': termination,
+        'plies': len(sans),
+        'effort': effort,
+        'pgn': format_pgn(headers, sans, fullmove, first_side == 'black', result),
+    }
+
+def format_pgn(headers, sans, fullmove, black_first, result, width=79):
+    tokens = []
+    if black_first and sans:
+        tokens.append(f"{fullmove}...")
+    for ply, name in enumerate(sans, 1 if black_first else 0):
+        if ply % 2 == 0:
+            tokens.append(f"{fullmove + ply // 2}.")
+        tokens.append(name)
+    tokens.append(result)
+    lines = [f'[{tag} "{value}"]' for tag, value in headers]
+    lines.append('')
+    line = ''
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > width:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+def load_openings(path=None):
+    # (fen, moves) pairs: the built-in lines, or the positions of an EPD or
+    # FEN file
+    if path is None:
+        return [(START_FEN, line.split()) for line in OPENINGS]
+    return [(fen, []) for _, fen, _ in iter_records(path)]
+
+def schedule(engine, opponent, openings, games):
+    # Each opening in turn, played by both engines with each colour
+    for number in range(games):
+        fen, moves = openings[(number // 2) % len(openings)]
+        if number % 2 == 0:
+            yield number + 1, engine, opponent, fen, moves
+        else:
+            yield number + 1, opponent, engine, fen, moves
+
+def play_games(engine, opponent, openings, games, depth=None, time_limit=None, workers=1, max_plies=400):
+    # Yield finished games in completion order; closing the generator
+    # early cancels the games not yet started
+    init_match_worker(depth, time_limit)
+    pairings = schedule(engine, opponent, openings, games)
+    if workers <= 1:
+        for round_number, white, black, fen, moves in pairings:
+            yield play_game(round_number, white, black, fen, moves, max_plies)
+        return
+
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_match_worker,
+                                                      initargs=(depth, time_limit))
+    pending = set()
+    try:
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers * IN_FLIGHT_PER_WORKER:
+                pairing = next(pairings, None)
+                if pairing is None:
+                    exhausted = True
+                    break
+                pending.add(executor.submit(play_game, *pairing, max_plies))
+            if not pending:
+                break
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
+
+class MatchScore:
+    # Wins, draws and losses of the first engine, with the Elo difference
+    # they imply and an SPRT between elo0 (H0) and elo1 (H1)
+
+    def __init__(self, elo0=0.0, elo1=5.0, alpha=0.05, beta=0.05):
+        self.wins = self.draws = self.losses = 0
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower_bound = math.log(beta / (1 - alpha))
+        self.upper_bound = math.log((1 - beta) / alpha)
+
+    def add(self, result, engine_is_white):
+        if result == '1/2-1/2':
+            self.draws += 1
+        elif (result == '1-0') == engine_is_white:
+            self.wins += 1
+        else:
+            self.losses += 1
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    @property
+    def score(self):
+        return (self.wins + self.draws / 2) / self.games if self.games else 0.5
+
+    @staticmethod
+    def score_and_variance(wins, draws, losses):
+        # Mean and variance of a single game's score
+        games = wins + draws + losses
+        if not games:
+            return 0.5, 0.0
+        score = (wins + draws / 2) / games
+        variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+        return score, variance
+
+    @staticmethod
+    def elo_from_score(score):
+        score = min(max(score, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / score - 1)
+
+    @staticmethod
+    def score_from_elo(elo):
+        return 1 / (1 + 10 ** (-elo / 400))
+
+    def elo(self):
+        # Elo difference and the half-width of its 95% confidence interval
+        if not self.games:
+            return 0.0, float('inf')
+        score, variance = self.score_and_variance(self.wins, self.draws, self.losses)
+        if not variance:
+            # One-sided results say least about the spread; pad them with
+            # half a game of each outcome, as llr does
+            _, variance = self.score_and_variance(self.wins + 0.5, self.draws + 0.5, self.losses + 0.5)
+        margin = 1.959964 * math.sqrt(variance / self.games)
+        low = self.elo_from_score(score - margin)
+        high = self.elo_from_score(score + margin)
+        return self.elo_from_score(score), (high - low) / 2
+
+    def llr(self):
+        # Log-likelihood ratio of H1 over H0 under a normal approximation
+        # of the game score distribution. Half a game of each outcome is
+        # added so that one-sided results still have a variance
+        if not self.games:
+            return 0.0
+        score, variance = self.score_and_variance(self.wins + 0.5, self.draws + 0.5, self.losses + 0.5)
+        score0 = self.score_from_elo(self.elo0)
+        score1 = self.score_from_elo(self.elo1)
+        return self.games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+
+    def sprt(self):
+        llr = self.llr()
+        if llr >= self.upper_bound:
+            return 'H1'
+        if llr <= self.lower_bound:
+            return 'H0'
+        return None
+
+    def __str__(self):
+        elo, margin = self.elo()
+        verdict = self.sprt()
+        return (f"{self.games} games +{self.wins} ={self.draws} -{self.losses}, "
+                f"Elo {elo:+.1f} +/- {margin:.1f}, LLR {self.llr():.2f} "
+                f"[{self.lower_bound:.2f}, {self.upper_bound:.2f}]"
+                + (f" {verdict} accepted" if verdict else ""))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play a match between two engines across processes.")
+    parser.add_argument('engine', choices=sorted(ENGINES), help="engine under test")
+    parser.add_argument('opponent', choices=sorted(ENGINES), help="reference engine")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--time', type=float, default=0.05, metavar='SECONDS', help="time per move")
+    parser.add_argument('--depth', type=int, default=None, help="depth limit per move")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--openings', metavar='PATH', help="EPD or FEN file of start positions")
+    parser.add_argument('--max-plies', type=int, default=400, help="adjudicate a draw after this many plies")
+    parser.add_argument('--pgn', metavar='PATH', help="write the games as PGN")
+    parser.add_argument('--elo0', type=float, default=0.0, help="SPRT null hypothesis, in Elo")
+    parser.add_argument('--elo1', type=float, default=5.0, help="SPRT alternative hypothesis, in Elo")
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    parser.add_argument('--stop-on-sprt', action='store_true', help="end the match once the SPRT decides")
+    parser.add_argument('--progress', type=float, default=5.0, metavar='SECONDS',
+                        help="seconds between progress reports (0 for none)")
+    args = parser.parse_args(argv)
+
+    openings = load_openings(args.openings)
+    if not openings:
+        parser.error("no opening positions")
+    score = MatchScore(args.elo0, args.elo1, args.alpha, args.beta)
+    terminations = {}
+    effort = {name: {'nodes': 0, 'seconds': 0.0, 'moves': 0, 'depth': 0} for name in (args.engine, args.opponent)}
+    pgn = open(args.pgn, 'w') if args.pgn else None
+    start_time = last_report = time.perf_counter()
+    games = play_games(args.engine, args.opponent, openings, args.games, args.depth, args.time,
+                       args.workers, args.max_plies)
+    try:
+        for game in games:
+            score.add(game['result'], game['white'] == args.engine)
+            terminations[game['termination']] = terminations.get(game['termination'], 0) + 1
+            for color in ('white', 'black'):
+                totals = effort[game[color]]
+                for name, value in game['effort'][color].items():
+                    totals[name] += value
+            if pgn:
+                pgn.write(game['pgn'] + '\n')
+            now = time.perf_counter()
+            if args.progress and now - last_report >= args.progress:
+                print(f"{score} ({score.games / (now - start_time):.2f} games/s)")
+                last_report = now
+            if args.stop_on_sprt and score.sprt():
+                break
+    finally:
+        games.close()
+        if pgn:
+            pgn.close()
+
+    elapsed = time.perf_counter() - start_time
+    print(f"{args.engine} vs {args.opponent}: {score}")
+    for name, totals in effort.items():
+        if totals['moves']:
+            print(f"{name}: average depth {totals['depth'] / totals['moves']:.1f}, "
+                  f"{totals['nodes'] / totals['seconds'] if totals['seconds'] else 0:.0f} nps")
+    print("Terminations: " + ', '.join(f"{name} {count}" for name, count in sorted(terminations.items())))
+    print(f"{score.games} games in {elapsed:.1f}s ({score.games / elapsed if elapsed else 0:.2f} games/s)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
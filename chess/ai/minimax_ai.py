@@ -1,105 +1,311 @@
-import copy
+import multiprocessing
 import concurrent.futures
-from chess.ai.base_ai import BaseAI
+from time import perf_counter
+from chess.chess_board import ChessBoard
+from chess.bitboard import ONGOING
+from chess.ai.base_ai import BaseAI, SearchTimeout, CLOCK_CHECK_MASK
+from chess.ai.search_stats import SearchStats
 from chess.ai.evaluation import basic_material_evaluation, advanced_evaluation
-from chess.pieces import Queen, Rook, Bishop, Knight, Pawn
+from chess.ai.transposition_table import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND, NO_MOVE, pack_move
+from chess.pieces import Queen, Pawn
+
+# Per-process search state, set up once by the pool initializer so each
+# worker keeps its own transposition table and evaluation cache between moves
+worker_ai = None
+shared_alpha = None
+
+def init_search_worker(color, hash_size_mb, quiescence, alpha, nodes):
+    global worker_ai, shared_alpha
+    worker_ai = MinimaxAI(color, hash_size_mb=hash_size_mb, quiescence=quiescence)
+    worker_ai.shared_nodes = nodes
+    shared_alpha = alpha
+
+def search_root_move(search_id, position, move, depth, beta, deadline, node_limit):
+    # Start from the best root score any worker has proven so far
+    alpha = shared_alpha.value
+    # Killers, history and the table age move on once per parent search,
+    # not per root move, so what the worker learns carries across its moves
+    if search_id != worker_ai.search_id:
+        worker_ai.search_id = search_id
+        worker_ai.move_ordering.new_search()
+        worker_ai.transposition_table.new_search()
+    worker_ai.stats = SearchStats()
+    worker_ai.search_start = perf_counter()
+    worker_ai.root_depth = depth
+    worker_ai.deadline = deadline
+    worker_ai.node_limit = node_limit
+    worker_ai.published_nodes = 0
+    worker_ai.limits_armed = True
+    # Moves still queued when the budget runs out are not started
+    if node_limit is not None and worker_ai.shared_nodes.value >= node_limit:
+        return None, False, move, worker_ai.stats
+    try:
+        value, move = worker_ai.evaluate_move(ChessBoard.from_snapshot(position), move, alpha, beta, depth)
+    except SearchTimeout:
+        worker_ai.publish_nodes()
+        return None, False, move, worker_ai.stats
+    with shared_alpha.get_lock():
+        if value > shared_alpha.value:
+            shared_alpha.value = value
+    worker_ai.publish_nodes()
+    # A score that failed low is only an upper bound
+    return value, value > alpha, move, worker_ai.stats
 
 class MinimaxAI(BaseAI):
-    def __init__(self, color):
-        super().__init__(color, advanced_evaluation)
-        self.transposition_table = {}
+    def __init__(self, color, depth=None, hash_size_mb=16, workers=None, on_iteration=None,
+                 time_limit=None, node_limit=None, quiescence=True, book=None):
+        super().__init__(color, advanced_evaluation, on_iteration=on_iteration,
+                         time_limit=time_limit, node_limit=node_limit, quiescence=quiescence, book=book)
+        self.depth = self.resolve_depth(depth, 2)
+        self.hash_size_mb = hash_size_mb
+        self.transposition_table = TranspositionTable(hash_size_mb)
+        # workers > 1 searches root moves in a persistent process pool
+        self.workers = workers
+        self.executor = None
+        self.shared_alpha = None
+        self.shared_search_nodes = None
+        # Numbers each parent search, so workers know when a new one starts
+        self.search_id = 0
+        # In a worker process: the count of nodes searched by all workers,
+        # so that they share one node budget, and this worker's part of it
+        self.shared_nodes = None
+        self.published_nodes = 0
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    def new_game(self):
+        super().new_game()
+        self.transposition_table.clear()
 
-    def make_move(self, chess_board, player_flipped):
+    def check_limits(self):
+        # Workers add their nodes to the shared count as often as the clock
+        # is read, so the whole search stops within a few hundred nodes per
+        # worker of the budget
+        if (self.shared_nodes is not None and self.node_limit is not None and self.limits_armed
+                and not self.stats.nodes & CLOCK_CHECK_MASK):
+            if self.publish_nodes() >= self.node_limit:
+                raise SearchTimeout()
+        super().check_limits()
+
+    def publish_nodes(self):
+        # Add the nodes searched since the last call to the shared count
+        # and return the new total
+        if self.shared_nodes is None or self.node_limit is None:
+            return 0
+        with self.shared_nodes.get_lock():
+            self.shared_nodes.value += self.stats.nodes - self.published_nodes
+            total = self.shared_nodes.value
+        self.published_nodes = self.stats.nodes
+        return total
+
+    def search_move(self, chess_board, player_flipped):
+        self.begin_search()
+        self.search_id += 1
         best_move = None
-        best_value = float('-inf')
-        alpha = float('-inf')
-        beta = float('inf')
-
-        # Iterative deepening
-        for depth in range(1, 3):  # Adjust the range for desired depth
-            best_move = None
-            best_value = float('-inf')
-
-            # Use a ThreadPoolExecutor for parallel move evaluation
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                futures = []
-                for move in self.get_all_possible_moves(chess_board, self.color):
-                    futures.append(executor.submit(self.evaluate_move, chess_board, move, alpha, beta, depth))
-
-                for future in concurrent.futures.as_completed(futures):
-                    move_value, move = future.result()
-                    if move_value > best_value:
-                        best_value = move_value
-                        best_move = move
-
-        # Apply the best move to the actual board
+        score = None
+        self.transposition_table.new_search()
+        moves = list(self.get_status(chess_board, self.color).moves)
+
+        # Iterative deepening; an iteration cut short by the budget is
+        # discarded and the last completed one decides. Each iteration starts
+        # with an aspiration window around the previous score and is searched
+        # again with the full window if the best score falls outside it
+        for depth in range(1, self.depth + 1):
+            if depth > 1 and not self.can_deepen():
+                break
+            self.root_depth = depth
+            alpha, beta = self.aspiration_window(score)
+            try:
+                scored_moves = self.search_root(chess_board, moves, alpha, beta, depth)
+                best_value = max((value for value, _, _ in scored_moves), default=None)
+                if best_value is not None and (best_value <= alpha or best_value >= beta):
+                    self.stats.aspiration_researches += 1
+                    scored_moves = self.search_root(chess_board, moves, float('-inf'), float('inf'), depth)
+            except SearchTimeout:
+                break
+            if scored_moves:
+                # Best move first, so the next iteration starts with it;
+                # exact scores win ties against fail-low bounds
+                scored_moves.sort(key=lambda scored: (scored[0], scored[1]), reverse=True)
+                # A fail-high search stops early, so keep the moves it skipped
+                searched = [move for _, _, move in scored_moves]
+                moves = searched + [move for move in moves if move not in searched]
+                best_move = moves[0]
+                score = scored_moves[0][0]
+            self.report_iteration(depth, score)
+
+        # The caller applies the move; promotions always go to a queen
         if best_move:
             start, end = best_move
             piece = chess_board.board[start[0]][start[1]]
 
             if isinstance(piece, Pawn) and (end[0] == 0 or end[0] == 7):
-                chess_board.board[end[0]][end[1]] = Queen(self.color)
-                chess_board.board[start[0]][start[1]] = None
-            #else:
-             
-             #   chess_board.update_board(best_move)
+                return self.finish_search(best_move, Queen)
 
-        return best_move, None
+        return self.finish_search(best_move, None)
 
     def evaluate_move(self, chess_board, move, alpha, beta, depth):
         start, end = move
         piece = chess_board.board[start[0]][start[1]]
 
-        board_copy = copy.deepcopy(chess_board)
+        board_copy = chess_board.clone()
+        board_copy.update_board(move)
         if isinstance(piece, Pawn) and (end[0] == 0 or end[0] == 7):
-            board_copy.board[end[0]][end[1]] = Queen(self.color)
-            board_copy.board[start[0]][start[1]] = None
-        else:
-            board_copy.update_board(move)
+            board_copy.promote(end, Queen)
 
         move_value = self.minimax(board_copy, depth, False, alpha, beta)
         return move_value, move
 
+    def search_root(self, chess_board, moves, alpha, beta, depth):
+        if self.workers and self.workers > 1:
+            return self.search_root_parallel(chess_board, moves, alpha, beta, depth)
+        return self.search_root_serial(chess_board, moves, alpha, beta, depth)
+
+    def search_root_serial(self, chess_board, moves, alpha, beta, depth):
+        scored_moves = []
+        for index, move in enumerate(moves):
+            # Principal variation search at the root as well
+            if index == 0:
+                move_value, move = self.evaluate_move(chess_board, move, alpha, beta, depth)
+            else:
+                move_value, move = self.evaluate_move(chess_board, move, alpha, alpha + 1, depth)
+                if alpha < move_value < beta:
+                    self.stats.researches += 1
+                    move_value, move = self.evaluate_move(chess_board, move, alpha, beta, depth)
+            scored_moves.append((move_value, move_value > alpha, move))
+            alpha = max(alpha, move_value)
+            if alpha >= beta:
+                break  # Failed high; the caller widens the window
+        return scored_moves
+
+    def search_root_parallel(self, chess_board, moves, alpha, beta, depth):
+        if self.executor is None:
+            self.shared_alpha = multiprocessing.Value('d', float('-inf'))
+            self.shared_search_nodes = multiprocessing.Value('q', 0)
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers, initializer=init_search_worker,
+                initargs=(self.color, self.hash_size_mb, self.quiescence, self.shared_alpha,
+                          self.shared_search_nodes))
+        if not moves:
+            return []
+        self.shared_alpha.value = alpha
+        # Workers count on from the nodes this search has already used
+        self.shared_search_nodes.value = self.stats.nodes
+        position = chess_board.snapshot()
+        # Workers only honour the budget once the first iteration is done
+        deadline = self.deadline if self.limits_armed else None
+        node_limit = self.node_limit if self.limits_armed else None
+
+        # Young brothers wait: the first (best-ordered) move sets alpha
+        # before its siblings are searched in parallel
+        results = [self.executor.submit(search_root_move, self.search_id, position, moves[0], depth, beta,
+                                        deadline, node_limit).result()]
+        futures = [self.executor.submit(search_root_move, self.search_id, position, move, depth, beta, deadline,
+                                        node_limit)
+                   for move in moves[1:]]
+        for future in concurrent.futures.as_completed(futures):
+            results.append(future.result())
+        # Fold the workers' statistics into this search
+        for _, _, _, stats in results:
+            self.stats.merge(stats)
+        if any(value is None for value, _, _, _ in results):
+            raise SearchTimeout()
+        self.check_limits()
+        return [(value, exact, move) for value, exact, move, _ in results]
+
     def minimax(self, chess_board, depth, maximizing_player, alpha, beta):
-        if depth == 0 or chess_board.is_checkmate(self.color) or chess_board.is_stalemate(self.color):
+        if depth == 0 and self.quiescence:
+            return self.quiesce(chess_board, maximizing_player, alpha, beta, 0)
+        self.stats.nodes += 1
+        self.check_limits()
+        if depth == 0:
             return self.evaluate_board(chess_board)
+        color = self.side_to_move(maximizing_player)
+        status = self.get_status(chess_board, color)
+        if status.result != ONGOING:
+            return self.terminal_score(status, color, depth)
+
+        key = self.hash_board(chess_board)
+        hash_move = NO_MOVE
+        entry = self.transposition_table.probe(key)
+        self.stats.tt_probes += 1
+        if entry:
+            self.stats.tt_hits += 1
+            entry_depth, score, bound, hash_move = entry
+            if entry_depth >= depth:
+                if bound == EXACT:
+                    return score
+                if bound == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                elif bound == UPPER_BOUND:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score
+
+        # Hash move, captures by MVV-LVA, killers, then history
+        moves = self.order_moves(chess_board, status.moves, hash_move, depth, color)
 
+        original_alpha, original_beta = alpha, beta
+        best_move = NO_MOVE
         if maximizing_player:
-            max_eval = float('-inf')
-            for move in self.get_all_possible_moves(chess_board, self.color):
-                chess_board.update_board(move)
-                eval = self.minimax(chess_board, depth - 1, False, alpha, beta)
+            best_eval = float('-inf')
+            for index, move in enumerate(moves):
+                self.make_search_move(chess_board, move)
+                # Principal variation search: the first move gets the full
+                # window, the rest a null window proving they are no better,
+                # re-searched only when that fails high
+                if index == 0:
+                    eval = self.minimax(chess_board, depth - 1, False, alpha, beta)
+                else:
+                    eval = self.minimax(chess_board, depth - 1, False, alpha, alpha + 1)
+                    if alpha < eval < beta:
+                        self.stats.researches += 1
+                        eval = self.minimax(chess_board, depth - 1, False, alpha, beta)
                 chess_board.undo_move()
-                max_eval = max(max_eval, eval)
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = self.pack_board_move(move)
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self.record_cutoff(chess_board, move, index, depth, color)
                     break
-            return max_eval
         else:
-            min_eval = float('inf')
-            opponent_color = 'black' if self.color == 'white' else 'white'
-            for move in self.get_all_possible_moves(chess_board, opponent_color):
-                chess_board.update_board(move)
-                eval = self.minimax(chess_board, depth - 1, True, alpha, beta)
+            best_eval = float('inf')
+            for index, move in enumerate(moves):
+                self.make_search_move(chess_board, move)
+                if index == 0:
+                    eval = self.minimax(chess_board, depth - 1, True, alpha, beta)
+                else:
+                    eval = self.minimax(chess_board, depth - 1, True, beta - 1, beta)
+                    if alpha < eval < beta:
+                        self.stats.researches += 1
+                        eval = self.minimax(chess_board, depth - 1, True, alpha, beta)
                 chess_board.undo_move()
-                min_eval = min(min_eval, eval)
+                if eval < best_eval:
+                    best_eval = eval
+                    best_move = self.pack_board_move(move)
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self.record_cutoff(chess_board, move, index, depth, color)
                     break
-            return min_eval
 
-    def get_ordered_moves(self, chess_board, color):
-        moves = self.get_all_possible_moves(chess_board, color)
-        # Simple move ordering: prioritize captures and checks
-        def move_priority(move):
-            start, end = move
-            piece = chess_board.board[start[0]][start[1]]
-            target = chess_board.board[end[0]][end[1]]
-            # Higher priority for captures and checks
-            return (target is not None, isinstance(piece, (Queen, Rook, Bishop, Knight)))
+        if best_eval <= original_alpha:
+            bound = UPPER_BOUND
+        elif best_eval >= original_beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        if moves:
+            self.transposition_table.store(key, depth, best_eval, bound, best_move)
+        return best_eval
 
-        return sorted(moves, key=move_priority, reverse=True)
+    def pack_board_move(self, move):
+        start, end = move
+        return pack_move(start[0] * 8 + start[1], end[0] * 8 + end[1])
 
     def hash_board(self, chess_board):
-        # Simple hash function for the board state
-        return hash(str(chess_board.board))
\ No newline at end of file
+        # Incrementally maintained Zobrist key of the position
+        return chess_board.zobrist_key
\ No newline at end of file
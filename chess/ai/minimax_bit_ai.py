@@ -1,72 +1,316 @@
-from chess.bitboard import BitboardChessBoard
+from chess.bitboard import BitboardChessBoard, PAWN, QUEEN, ROOK, BISHOP, KNIGHT, ONGOING, COLOR_INDEX
+from chess.pieces import Queen, Rook, Bishop, Knight
 from chess.chess_board import ChessBoard
-from chess.ai.base_ai import BaseAI
+from chess.ai.base_ai import BaseAI, SearchTimeout, MATE_SCORE
 from chess.ai.evaluation import basic_material_evaluation
-import copy
+from chess.ai.bitbases import Bitbases, WIN, LOSS
+from chess.ai.transposition_table import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND, NO_MOVE, pack_move
+from time import perf_counter
+
+NULL_MOVE_REDUCTION = 2  # Extra plies taken off the search after passing
+NULL_MOVE_MIN_DEPTH = 3
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3  # Moves searched at full depth before reducing the rest
+# Bitbase wins score below any mate the search finds itself, sooner ones higher
+BITBASE_WIN_SCORE = MATE_SCORE // 2
 
 class MinimaxBitAI(BaseAI):
-    def __init__(self, color, depth=3):
-        super().__init__(color, basic_material_evaluation)
-        self.depth = depth
+    def __init__(self, color, depth=None, hash_size_mb=16, batch_leaves=False, on_iteration=None,
+                 time_limit=None, node_limit=None, quiescence=True, null_move=True,
+                 late_move_reductions=True, book=None, bitbases=None):
+        # Leaves are scored from running totals kept on the bitboard, which
+        # is cheaper than a cache probe, so the evaluation cache goes unused
+        super().__init__(color, basic_material_evaluation, eval_cache_entries=1, on_iteration=on_iteration,
+                         time_limit=time_limit, node_limit=node_limit, quiescence=quiescence, book=book)
+        # Selective search: prune nodes where even passing keeps the score
+        # beyond the window, and search quiet moves ordered late less deeply
+        self.null_move = null_move
+        self.late_move_reductions = late_move_reductions
+        # Endgame tables (a Bitbases or a directory) looked up in place of
+        # searching positions with few pieces left
+        self.bitbases = Bitbases(bitbases) if isinstance(bitbases, str) else bitbases
+        self.depth = self.resolve_depth(depth, 3)
+        self.root_depth = self.depth
+        self.transposition_table = TranspositionTable(hash_size_mb)
+        # batch_leaves scores each sibling set of leaves in one NumPy call
+        # with the batch evaluator instead of one position at a time; leaves
+        # are only static without quiescence search. Every other static
+        # score (depth-0 nodes left by reductions, the null-move pre-check)
+        # then comes from the same evaluator, so bounds compare like with like
+        self.batch_leaves = batch_leaves and not quiescence
+        if self.batch_leaves:
+            from chess.ai import batch_evaluation
+            self.batch_evaluation = batch_evaluation
+
+    def new_game(self):
+        super().new_game()
+        self.transposition_table.clear()
 
-    def make_move(self, chess_board, player_flipped):
+    def search_move(self, chess_board, player_flipped):
         # Convert the traditional board to a bitboard
+        self.begin_search()
         bitboard = chess_board.board_to_bitboard()
+        self.transposition_table.new_search()
 
-        # Perform minimax to find the best move
-        best_move, _ = self.minimax(bitboard, self.depth, True, float('-inf'), float('inf'))
+        # Iterative deepening: each iteration leaves its best move in the
+        # transposition table to be searched first by the next, and one cut
+        # short by the budget is discarded. Iterations start with a narrow
+        # window around the last score and widen it only if the score falls
+        # outside
+        best_move = None
+        score = None
+        for depth in range(1, self.depth + 1):
+            if depth > 1 and not self.can_deepen():
+                break
+            self.root_depth = depth
+            alpha, beta = self.aspiration_window(score)
+            try:
+                move, value = self.minimax(bitboard, depth, True, alpha, beta)
+                if value <= alpha or value >= beta:
+                    self.stats.aspiration_researches += 1
+                    move, value = self.minimax(bitboard, depth, True, float('-inf'), float('inf'))
+            except SearchTimeout:
+                break
+            if move is None:
+                break
+            best_move = move
+            score = value
+            self.report_iteration(depth, score)
 
-        # Debug: Check if a move was found
+        # No legal moves: nothing to play, as in MinimaxAI
         if best_move is None:
-            print("No valid moves found by MinimaxBitAI")
-            raise Exception("No valid moves found by MinimaxBitAI")
+            return self.finish_search(None, None)
 
-        # Apply the best move to the traditional board
-        start, end = best_move
-        chess_board.update_board((start, end))
-        return best_move, None
+        # Translate bitboard squares back to (row, col) for the caller,
+        # which applies the move itself
+        start, end = best_move[:2]
+        move = (chess_board.square_position(start), chess_board.square_position(end))
+        if len(best_move) == 3:
+            return self.finish_search(move, {QUEEN: Queen, ROOK: Rook, BISHOP: Bishop, KNIGHT: Knight}[best_move[2] % 6])
+        return self.finish_search(move, None)
 
-    def minimax(self, bitboard, depth, maximizing_player, alpha, beta):
-        if depth == 0 or self.is_terminal_node(bitboard):
+    def minimax(self, bitboard, depth, maximizing_player, alpha, beta, allow_null=True):
+        if depth == 0 and self.quiescence:
+            return None, self.quiesce(bitboard, maximizing_player, alpha, beta, 0)
+        self.stats.nodes += 1
+        self.check_limits()
+        if depth == 0:
             return None, self.evaluate_board(bitboard)
+        color = self.side_to_move(maximizing_player)
+        status = self.get_status(bitboard, color)
+        if status.result != ONGOING:
+            return None, self.terminal_score(status, color, depth)
+        # The root still searches, so that it has a move to return
+        if self.bitbases is not None and depth < self.root_depth:
+            score = self.bitbase_score(bitboard, color)
+            if score is not None:
+                return None, score
 
-        if maximizing_player:
-            max_eval = float('-inf')
-            best_move = None
-            for move in bitboard.generate_moves(self.color):
+        key = bitboard.zobrist_key
+        hash_move = NO_MOVE
+        entry = self.transposition_table.probe(key)
+        self.stats.tt_probes += 1
+        if entry:
+            self.stats.tt_hits += 1
+            entry_depth, score, bound, hash_move = entry
+            # The root always searches so that it has a move to return
+            if entry_depth >= depth and depth < self.root_depth:
+                if bound == EXACT:
+                    return None, score
+                if bound == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                elif bound == UPPER_BOUND:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return None, score
+
+        # Null move: if the opponent cannot reach the window even after a
+        # free move, a real move would do at least as well. Not in check,
+        # not twice in a row and not with only pawns left, where passing
+        # may be the best move (zugzwang)
+        if (self.null_move and allow_null and depth >= NULL_MOVE_MIN_DEPTH and depth < self.root_depth
+                and not status.in_check and self.has_pieces(bitboard, color)):
+            score = self.null_move_score(bitboard, depth, maximizing_player, alpha, beta)
+            if score is not None:
+                self.stats.null_move_cutoffs += 1
+                return None, score
+
+        # Hash move, captures by MVV-LVA, killers, then history
+        moves = self.order_moves(bitboard, status.moves, hash_move, depth, color)
+
+        original_alpha, original_beta = alpha, beta
+        best_move = None
+        if self.batch_leaves and depth == 1:
+            best_move, best_eval = self.score_leaves(bitboard, moves, maximizing_player)
+        elif maximizing_player:
+            best_eval = float('-inf')
+            for index, move in enumerate(moves):
                 bitboard.update_board(*move)
-                _, eval = self.minimax(bitboard, depth - 1, False, alpha, beta)
+                # Principal variation search: the first move gets the full
+                # window, the rest a null window proving they are no better,
+                # re-searched only when that fails high
+                if index == 0:
+                    _, eval = self.minimax(bitboard, depth - 1, False, alpha, beta)
+                else:
+                    # Late quiet moves are tried at reduced depth first and
+                    # searched fully only if they turn out better
+                    reduction = self.reduction(bitboard, move, index, depth, status.in_check)
+                    _, eval = self.minimax(bitboard, depth - 1 - reduction, False, alpha, alpha + 1)
+                    if reduction and eval > alpha:
+                        _, eval = self.minimax(bitboard, depth - 1, False, alpha, alpha + 1)
+                    if alpha < eval < beta:
+                        self.stats.researches += 1
+                        _, eval = self.minimax(bitboard, depth - 1, False, alpha, beta)
                 bitboard.undo_move()
-                if eval > max_eval:
-                    max_eval = eval
+                if eval > best_eval:
+                    best_eval = eval
                     best_move = move
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self.record_cutoff(bitboard, move, index, depth, color)
                     break
-            return best_move, max_eval
         else:
-            min_eval = float('inf')
-            opponent_color = 'black' if self.color == 'white' else 'white'
-            for move in bitboard.generate_moves(opponent_color):
+            best_eval = float('inf')
+            for index, move in enumerate(moves):
                 bitboard.update_board(*move)
-                _, eval = self.minimax(bitboard, depth - 1, True, alpha, beta)
+                if index == 0:
+                    _, eval = self.minimax(bitboard, depth - 1, True, alpha, beta)
+                else:
+                    reduction = self.reduction(bitboard, move, index, depth, status.in_check)
+                    _, eval = self.minimax(bitboard, depth - 1 - reduction, True, beta - 1, beta)
+                    if reduction and eval < beta:
+                        _, eval = self.minimax(bitboard, depth - 1, True, beta - 1, beta)
+                    if alpha < eval < beta:
+                        self.stats.researches += 1
+                        _, eval = self.minimax(bitboard, depth - 1, True, alpha, beta)
                 bitboard.undo_move()
-                if eval < min_eval:
-                    min_eval = eval
+                if eval < best_eval:
+                    best_eval = eval
+                    best_move = move
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self.record_cutoff(bitboard, move, index, depth, color)
                     break
-            return None, min_eval
+
+        if best_eval <= original_alpha:
+            bound = UPPER_BOUND
+        elif best_eval >= original_beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        if best_move is not None:
+            self.transposition_table.store(key, depth, best_eval, bound, pack_move(*best_move))
+        return (best_move if maximizing_player else None), best_eval
+
+    def bitbase_score(self, bitboard, color):
+        # Table result of a position from the AI's point of view, or None
+        entry = self.bitbases.probe(bitboard)
+        if entry is None:
+            return None
+        self.stats.bitbase_hits += 1
+        result, distance = entry
+        if result == WIN:
+            score = BITBASE_WIN_SCORE - distance
+        elif result == LOSS:
+            score = distance - BITBASE_WIN_SCORE
+        else:
+            score = 0
+        return score if color == self.color else -score
+
+    def has_pieces(self, bitboard, color):
+        # Any knight, bishop, rook or queen
+        first_code = 6 * COLOR_INDEX[color]
+        return any(bitboard.bitboards[first_code + piece_type] for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN))
+
+    def null_move_score(self, bitboard, depth, maximizing_player, alpha, beta):
+        # Score proving a cutoff after passing the turn, or None. The pass is
+        # only tried when the static score already lies beyond the window
+        static_score = self.evaluate_board(bitboard)
+        if (static_score < beta) if maximizing_player else (static_score > alpha):
+            return None
+        bitboard.make_null_move()
+        if maximizing_player:
+            _, score = self.minimax(bitboard, depth - 1 - NULL_MOVE_REDUCTION, False, beta - 1, beta,
+                                    allow_null=False)
+        else:
+            _, score = self.minimax(bitboard, depth - 1 - NULL_MOVE_REDUCTION, True, alpha, alpha + 1,
+                                    allow_null=False)
+        bitboard.undo_null_move()
+        # Mates found after passing are not real; report the bound instead
+        if maximizing_player and score >= beta:
+            return beta if score >= MATE_SCORE else score
+        if not maximizing_player and score <= alpha:
+            return alpha if score <= -MATE_SCORE else score
+        return None
+
+    def reduction(self, bitboard, move, index, depth, in_check):
+        # Plies to take off a move already made on the board: quiet moves
+        # ordered late, not out of or into check, by one ply or two when
+        # very late
+        if (not self.late_move_reductions or in_check or depth < LMR_MIN_DEPTH or index < LMR_MIN_MOVES
+                or len(move) == 3 or bitboard.is_in_check(bitboard.side_to_move)):
+            return 0
+        # Captures, en passant included, are searched at full depth
+        _, end, piece, captured, _, _, en_passant, _, _ = bitboard.move_history[-1]
+        if captured is not None or (piece % 6 == PAWN and end == en_passant):
+            return 0
+        self.stats.reductions += 1
+        return 1 if index < 2 * LMR_MIN_MOVES or depth < 6 else 2
+
+    def move_info(self, bitboard, move):
+        # (packed, victim type, attacker type, promotion type) of a bitboard move
+        start, end = move[0], move[1]
+        piece = bitboard.mailbox[start]
+        target = bitboard.mailbox[end]
+        victim = None if target is None else target % 6
+        if victim is None and piece % 6 == PAWN and end == bitboard.en_passant:
+            victim = PAWN
+        promotion = move[2] % 6 if len(move) == 3 else None
+        return pack_move(*move), victim, piece % 6, promotion
+
+    def tactical_moves(self, bitboard, moves):
+        mailbox = bitboard.mailbox
+        en_passant = bitboard.en_passant
+        return [move for move in moves
+                if mailbox[move[1]] is not None or len(move) == 3
+                or (move[1] == en_passant and mailbox[move[0]] % 6 == PAWN)]
+
+    def make_search_move(self, bitboard, move):
+        bitboard.update_board(*move)
+
+    def static_exchange(self, bitboard, move):
+        return bitboard.static_exchange(move[0], move[1])
+
+    def score_leaves(self, bitboard, moves, maximizing_player):
+        # Every child is a leaf, so there is nothing for alpha-beta to prune
+        # below this node; encode them all and evaluate them together
+        encoded = []
+        for move in moves:
+            bitboard.update_board(*move)
+            encoded.append(self.batch_evaluation.encode_position(bitboard))
+            bitboard.undo_move()
+        start = perf_counter()
+        scores = self.batch_evaluation.evaluate_batch(self.batch_evaluation.stack_positions(encoded), self.color)
+        self.stats.evaluation_time += perf_counter() - start
+        # The children are searched nodes like any other leaf
+        self.stats.nodes += len(moves)
+        self.stats.leaf_evaluations += len(moves)
+        best = int(scores.argmax() if maximizing_player else scores.argmin())
+        return moves[best], int(scores[best])
 
     def evaluate_board(self, bitboard):
-        # Implement a simple evaluation function
-        piece_values = {'P': 1, 'N': 3, 'B': 3, 'R': 5, 'Q': 9, 'K': 0,
-                        'p': -1, 'n': -3, 'b': -3, 'r': -5, 'q': -9, 'k': 0}
-        score = 0
-        for piece, bitboard_value in bitboard.bitboards.items():
-            score += piece_values[piece] * bin(bitboard_value).count('1')
+        # Running material and piece-square totals, white minus black, or
+        # the batch evaluator's score when leaves are batched; scores are
+        # from the AI's point of view, like the mate scores
+        stats = self.stats
+        start = perf_counter()
+        stats.leaf_evaluations += 1
+        if self.batch_leaves:
+            batch = self.batch_evaluation
+            score = int(batch.evaluate_batch(batch.stack_positions([batch.encode_position(bitboard)]), self.color)[0])
+        else:
+            score = bitboard.material_score + bitboard.psqt_score
+            if self.color != 'white':
+                score = -score
+        stats.evaluation_time += perf_counter() - start
         return score
-
-    def is_terminal_node(self, bitboard):
-        # Check for checkmate or stalemate
-        return bitboard.is_checkmate(self.color) or bitboard.is_stalemate(self.color)
\ No newline at end of file
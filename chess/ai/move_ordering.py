@@ -0,0 +1,77 @@
+from chess.ai.transposition_table import NO_MOVE
+
+# Moves are ordered by these bands, best first: the hash (or PV) move,
+# captures by MVV-LVA, promotions, the two killers of the ply, then quiet
+# moves by their history score, which is kept below the killer band
+HASH_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 29
+PROMOTION_SCORE = 1 << 28
+KILLER_SCORE = 1 << 27
+HISTORY_LIMIT = 1 << 26
+
+MAX_PLY = 128
+
+class MoveOrdering:
+    # Killer moves per ply and a butterfly history table per side, indexed
+    # by the from/to bits of a packed move. Engines describe their moves
+    # with (packed, victim_type, attacker_type, promotion_type) tuples, so
+    # both board representations share the same heuristics
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.killers = [[NO_MOVE, NO_MOVE] for _ in range(MAX_PLY)]
+        self.history = [[0] * 4096 for _ in range(2)]
+
+    def new_search(self):
+        # Killers are position specific; history is only aged
+        for killers in self.killers:
+            killers[0] = killers[1] = NO_MOVE
+        self.age_history()
+
+    def age_history(self):
+        for table in self.history:
+            for index, value in enumerate(table):
+                if value:
+                    table[index] = value >> 1
+
+    def score(self, info, hash_move, killers, history):
+        packed, victim, attacker, promotion = info
+        if packed == hash_move:
+            return HASH_MOVE_SCORE
+        if victim is not None:
+            # Most valuable victim first, then least valuable attacker
+            return CAPTURE_SCORE + 8 * victim - attacker
+        if promotion is not None:
+            return PROMOTION_SCORE + promotion
+        if packed == killers[0]:
+            return KILLER_SCORE + 1
+        if packed == killers[1]:
+            return KILLER_SCORE
+        return history[packed & 0xFFF]
+
+    def ply_killers(self, ply):
+        return self.killers[max(0, min(ply, MAX_PLY - 1))]
+
+    def order(self, moves, infos, hash_move, ply, side):
+        killers = self.ply_killers(ply)
+        history = self.history[side]
+        scores = [self.score(info, hash_move, killers, history) for info in infos]
+        order = sorted(range(len(moves)), key=scores.__getitem__, reverse=True)
+        return [moves[index] for index in order]
+
+    def record_cutoff(self, info, ply, depth, side):
+        # Only quiet moves feed the killers and history; captures and
+        # promotions are already ordered ahead of them
+        packed, victim, _, promotion = info
+        if victim is not None or promotion is not None:
+            return
+        killers = self.ply_killers(ply)
+        if killers[0] != packed:
+            killers[1] = killers[0]
+            killers[0] = packed
+        history = self.history[side]
+        history[packed & 0xFFF] += depth * depth
+        if history[packed & 0xFFF] >= HISTORY_LIMIT:
+            self.age_history()
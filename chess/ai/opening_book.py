@@ -0,0 +1,96 @@
+# Polyglot opening book probe.
+#
+# A Polyglot .bin file is a sorted array of 16-byte big-endian entries:
+# position key, move, weight and a learn field. The file is memory-mapped and
+# binary searched on the key, so a probe reads a handful of entries and the
+# book is never loaded into Python objects. Board Zobrist keys use the
+# Polyglot random array, so they are book keys as they stand.
+import mmap
+import os
+import random
+import struct
+
+from chess.bitboard import KNIGHT, BISHOP, ROOK, QUEEN
+from chess.pieces import King, Knight, Bishop, Rook, Queen
+
+ENTRY = struct.Struct('>QHHI')  # key, move, weight, learn
+KEY = struct.Struct('>Q')
+
+# Promotion field of a book move: none, knight, bishop, rook, queen
+PROMOTION_TYPES = [None, KNIGHT, BISHOP, ROOK, QUEEN]
+PROMOTION_CLASSES = {KNIGHT: Knight, BISHOP: Bishop, ROOK: Rook, QUEEN: Queen}
+
+# Books write castling as the king taking its own rook
+CASTLING_MOVES = {(60, 63): (60, 62), (60, 56): (60, 58), (4, 7): (4, 6), (4, 0): (4, 2)}
+
+def book_square(square):
+    # Polyglot numbers squares from a1 (rank 1 first); boards from a8
+    return (7 - (square >> 3)) * 8 + (square & 7)
+
+def decode_move(move):
+    # (start, end, promotion type) in bitboard squares, castling as written
+    end = book_square(move & 0x3F)
+    start = book_square((move >> 6) & 0x3F)
+    return start, end, PROMOTION_TYPES[(move >> 12) & 0x7]
+
+class OpeningBook:
+    def __init__(self, path, rng=None):
+        self.path = path
+        self.random = rng or random.Random()
+        with open(path, 'rb') as book_file:
+            size = os.fstat(book_file.fileno()).st_size
+            # mmap cannot map an empty file
+            self.data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.count = size // ENTRY.size
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __len__(self):
+        return self.count
+
+    def entries(self, key):
+        # (move, weight) of every entry for a position key
+        data = self.data
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(data, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        for index in range(low, self.count):
+            entry_key, move, weight, _ = ENTRY.unpack_from(data, index * ENTRY.size)
+            if entry_key != key:
+                break
+            entries.append((move, weight))
+        return entries
+
+    def choose(self, candidates):
+        # Pick in proportion to the weights; zero-weight moves are never played
+        total = sum(weight for _, weight in candidates)
+        if not total:
+            return None
+        pick = self.random.randrange(total)
+        for candidate, weight in candidates:
+            if pick < weight:
+                return candidate
+            pick -= weight
+
+    def probe(self, chess_board):
+        # A legal book move for the side to move of a ChessBoard as
+        # ((row, col), (row, col)) and promotion class, or None
+        legal = chess_board.get_status(chess_board.side_to_move).moves
+        candidates = []
+        for raw_move, weight in self.entries(chess_board.zobrist_key):
+            start, end, promotion = decode_move(raw_move)
+            row, col = chess_board.square_position(start)
+            if (start, end) in CASTLING_MOVES and isinstance(chess_board.board[row][col], King):
+                start, end = CASTLING_MOVES[start, end]
+            move = (chess_board.square_position(start), chess_board.square_position(end))
+            # ChessBoard lists each promotion once, whatever the piece
+            if move in legal:
+                candidates.append(((move, PROMOTION_CLASSES.get(promotion)), weight))
+        return self.choose(candidates)
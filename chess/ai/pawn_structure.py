@@ -0,0 +1,79 @@
+# Pawn structure terms computed from pawn bitboards and cached by pawn key.
+#
+# Squares are numbered row * 8 + col in the bitboard orientation (row 0 is
+# rank 8, white pawns advance towards it). Pawn structure rarely changes
+# between sibling nodes, so the terms are looked up by the boards' pawn-only
+# Zobrist key before anything is scanned.
+from chess.bitboard import WHITE_PAWN, BLACK_PAWN
+from chess.pieces import Pawn
+from chess.ai.evaluation_cache import EvaluationCache
+
+# Shared with the vectorised pawn terms in batch_evaluation
+DOUBLED_PAWN_PENALTY = 10
+ISOLATED_PAWN_PENALTY = 10
+PASSED_PAWN_BONUS = 20
+
+FILE_MASKS = [0x0101010101010101 << col for col in range(8)]
+ADJACENT_FILE_MASKS = [(FILE_MASKS[col - 1] if col > 0 else 0) | (FILE_MASKS[col + 1] if col < 7 else 0)
+                       for col in range(8)]
+
+def passed_pawn_mask(position, forward):
+    # Squares ahead of a pawn on its own and the adjacent files
+    row, col = divmod(position, 8)
+    mask = 0
+    for ahead in range(row + forward, 8 if forward > 0 else -1, forward):
+        for file in (col - 1, col, col + 1):
+            if 0 <= file < 8:
+                mask |= 1 << (ahead * 8 + file)
+    return mask
+
+PASSED_PAWN_MASKS = {
+    'white': [passed_pawn_mask(position, -1) for position in range(64)],
+    'black': [passed_pawn_mask(position, 1) for position in range(64)],
+}
+
+# Shared by every evaluation in this process; search workers get their own
+pawn_cache = EvaluationCache(1 << 14)
+
+def pawn_bitboards(board):
+    # White and black pawn bitboards of a BitboardChessBoard or ChessBoard
+    if hasattr(board, 'bitboards'):
+        return board.bitboards[WHITE_PAWN], board.bitboards[BLACK_PAWN]
+    pawns = [0, 0]
+    for row in range(8):
+        for col in range(8):
+            piece = board.board[row][col]
+            if isinstance(piece, Pawn):
+                pawns[piece.color == 'black'] |= 1 << board.square_index(row, col)
+    return pawns[0], pawns[1]
+
+def side_pawn_score(pawns, enemy_pawns, color):
+    score = 0
+    for col in range(8):
+        count = bin(pawns & FILE_MASKS[col]).count('1')
+        if count == 0:
+            continue
+        if count > 1:
+            score -= DOUBLED_PAWN_PENALTY * (count - 1)
+        if not pawns & ADJACENT_FILE_MASKS[col]:
+            score -= ISOLATED_PAWN_PENALTY * count
+
+    passed_masks = PASSED_PAWN_MASKS[color]
+    while pawns:
+        position = pawns.bit_length() - 1
+        if not enemy_pawns & passed_masks[position]:
+            score += PASSED_PAWN_BONUS
+        pawns &= ~(1 << position)
+    return score
+
+def pawn_structure_score(white_pawns, black_pawns):
+    # Doubled, isolated and passed pawn terms, white minus black
+    return (side_pawn_score(white_pawns, black_pawns, 'white')
+            - side_pawn_score(black_pawns, white_pawns, 'black'))
+
+def cached_pawn_structure_score(board):
+    score = pawn_cache.get(board.pawn_key)
+    if score is None:
+        score = pawn_structure_score(*pawn_bitboards(board))
+        pawn_cache.put(board.pawn_key, score)
+    return int(score)
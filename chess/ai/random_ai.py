@@ -3,28 +3,14 @@ from chess.pieces import Queen, Rook, Bishop, Knight, Pawn
 from chess.ai.base_ai import BaseAI
 
 class RandomAI(BaseAI):
-    def __init__(self, color):
-        self.color = color
+    def __init__(self, color, on_iteration=None, book=None):
+        super().__init__(color, None, eval_cache_entries=1, on_iteration=on_iteration, book=book)
 
-    def make_move(self, chess_board, player_flipped):
-        all_moves = []
-        ai_flipped = player_flipped
-        for row in range(8):
-            for col in range(8):
-                piece = chess_board.board[row][col]
-                if piece and piece.color == self.color:
-                    valid_moves = chess_board.get_valid_moves((row, col), flipped=ai_flipped)
-                    for move in valid_moves:
-                        # Simulate the move
-                        original_piece = chess_board.board[move[0]][move[1]]
-                        chess_board.board[move[0]][move[1]] = piece
-                        chess_board.board[row][col] = None
-                        in_check = chess_board.is_in_check(self.color)
-                        # Undo the move
-                        chess_board.board[row][col] = piece
-                        chess_board.board[move[0]][move[1]] = original_piece
-                        if not in_check:
-                            all_moves.append(((row, col), move))
+    def search_move(self, chess_board, player_flipped):
+        self.begin_search()
+        all_moves = list(self.get_status(chess_board, self.color).moves)
+        self.stats.nodes += 1
+        self.report_iteration(1)
 
         if all_moves:
             chosen_move = random.choice(all_moves)
@@ -35,10 +21,10 @@ class RandomAI(BaseAI):
             # Handle promotion
             if isinstance(piece, Pawn) and (end[0] == 0 or end[0] == 7):
                 promotion_choice = self.choose_promotion_piece()
-                return chosen_move, promotion_choice  # Return the move and promotion choice
+                return self.finish_search(chosen_move, promotion_choice)  # Return the move and promotion choice
 
-            return chosen_move, None  # Return the move without promotion
-        return None, None
+            return self.finish_search(chosen_move, None)  # Return the move without promotion
+        return self.finish_search(None, None)
 
     def choose_promotion_piece(self):
         return random.choice([Queen, Rook, Bishop, Knight])
\ No newline at end of file
@@ -0,0 +1,63 @@
+from collections import namedtuple
+
+class SearchStats:
+    # Counters and timers for one make_move call. Plain attribute updates
+    # keep the cost per node to a few bytecodes
+
+    COUNTERS = ('nodes', 'leaf_evaluations', 'beta_cutoffs', 'first_move_cutoffs',
+                'cache_probes', 'cache_hits', 'tt_probes', 'tt_hits', 'researches',
+                'aspiration_researches', 'quiescence_nodes', 'null_move_cutoffs', 'reductions',
+                'book_hits', 'bitbase_hits')
+    TIMERS = ('movegen_time', 'evaluation_time')
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        for name in self.TIMERS:
+            setattr(self, name, 0.0)
+        self.depth = 0
+        self.score = None  # Of the last completed iteration, from the AI's side
+        self.elapsed = 0.0
+
+    def merge(self, other):
+        # Fold in the counts of a search done elsewhere (e.g. a worker process)
+        for name in self.COUNTERS + self.TIMERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    @property
+    def nps(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def first_move_cutoff_rate(self):
+        # Share of cutoffs produced by the first move searched; a measure of
+        # move ordering quality
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    @property
+    def cache_hit_rate(self):
+        return self.cache_hits / self.cache_probes if self.cache_probes else 0.0
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def as_dict(self):
+        stats = {name: getattr(self, name) for name in self.COUNTERS + self.TIMERS}
+        stats.update(depth=self.depth, score=self.score, elapsed=self.elapsed, nps=self.nps,
+                     first_move_cutoff_rate=self.first_move_cutoff_rate,
+                     cache_hit_rate=self.cache_hit_rate, tt_hit_rate=self.tt_hit_rate)
+        return stats
+
+    def __repr__(self):
+        return (f"SearchStats(depth={self.depth}, nodes={self.nodes}, nps={self.nps:.0f}, "
+                f"cutoffs={self.beta_cutoffs}, first_move_cutoff_rate={self.first_move_cutoff_rate:.2f}, "
+                f"cache_hit_rate={self.cache_hit_rate:.2f}, tt_hit_rate={self.tt_hit_rate:.2f})")
+
+class SearchResult(namedtuple('SearchResult', ['move', 'promotion'])):
+    # Unpacks as (move, promotion) like a plain make_move result, with the
+    # statistics of the search attached
+    def __new__(cls, move, promotion, stats=None):
+        result = super().__new__(cls, move, promotion)
+        result.stats = stats
+        return result
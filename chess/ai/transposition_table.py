@@ -0,0 +1,65 @@
+from array import array
+
+# Bound types stored with each score
+EXACT, LOWER_BOUND, UPPER_BOUND = 1, 2, 3
+
+ENTRY_BYTES = 16  # One 64-bit key slot and one 64-bit data slot
+NO_MOVE = 0
+SCORE_LIMIT = (1 << 31) - 1
+
+def pack_move(start, end, promotion=None):
+    # 6 bits per square and 4 bits for the promotion piece code + 1
+    return start | (end << 6) | ((0 if promotion is None else promotion + 1) << 12)
+
+def unpack_move(packed):
+    promotion = (packed >> 12) & 0xF
+    return packed & 0x3F, (packed >> 6) & 0x3F, None if promotion == 0 else promotion - 1
+
+class TranspositionTable:
+    def __init__(self, size_mb=16):
+        # Round the entry count down to a power of two so the index is a mask
+        entries = max(1, (size_mb * 1024 * 1024) // ENTRY_BYTES)
+        self.size = 1 << (entries.bit_length() - 1)
+        self.mask = self.size - 1
+        self.keys = array('Q', bytes(8 * self.size))
+        self.data = array('Q', bytes(8 * self.size))
+        self.age = 0
+
+    def new_search(self):
+        # Entries from earlier searches become preferred replacement victims
+        self.age = (self.age + 1) & 0x3F
+
+    def clear(self):
+        self.keys = array('Q', bytes(8 * self.size))
+        self.data = array('Q', bytes(8 * self.size))
+        self.age = 0
+
+    def probe(self, key):
+        index = key & self.mask
+        data = self.data[index]
+        # Keys are stored xor'd with their data, so the one key word also
+        # checks that the data word belongs to the same entry
+        if not data or self.keys[index] ^ data != key:
+            return None
+        move = data & 0xFFFF
+        depth = (data >> 16) & 0xFF
+        bound = (data >> 24) & 0x3
+        score = (data >> 32) - (1 << 31)
+        return depth, score, bound, move
+
+    def store(self, key, depth, score, bound, move=NO_MOVE):
+        index = key & self.mask
+        old_data = self.data[index]
+        if old_data:
+            same_position = self.keys[index] ^ old_data == key
+            # Depth-preferred: keep a deeper entry from the current search
+            if not same_position and (old_data >> 26) & 0x3F == self.age and (old_data >> 16) & 0xFF > depth:
+                return
+            if same_position and move == NO_MOVE:
+                move = old_data & 0xFFFF
+
+        score = int(max(-SCORE_LIMIT, min(SCORE_LIMIT, score)))
+        depth = max(0, min(255, depth))
+        data = move | (depth << 16) | (bound << 24) | (self.age << 26) | ((score + (1 << 31)) << 32)
+        self.data[index] = data
+        self.keys[index] = key ^ data
@@ -0,0 +1,143 @@
+# Precomputed attack tables for the bitboard engine.
+#
+# Squares are numbered row * 8 + col, matching BitboardChessBoard. Sliding
+# attacks use magic bitboards: the relevant blockers of a square are masked
+# out of the occupancy, multiplied by a magic number and shifted down to a
+# dense index into a per-square table built once at import time.
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+ROOK_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+BISHOP_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+# Magic multipliers found offline by random search over sparse candidates
+ROOK_MAGICS = [
+    0x4080004002201882, 0x01C0004420001000, 0x0080088090002000, 0x1100083000042100,
+    0x0200200A00501418, 0x1100080500040002, 0x0280010000802200, 0x12000040240A0089,
+    0x0810800080254008, 0x0039002080400500, 0x8000802000883000, 0x1100801001180082,
+    0x4801000801024410, 0x0042000200053018, 0x0002003600040801, 0xA002000284620401,
+    0x04C0008002426080, 0x0020004010044060, 0x8800828010006001, 0x0000A20008104200,
+    0x8040110008010014, 0x0000808002000400, 0x0004440002181027, 0xD010020004204881,
+    0x28800040C0082004, 0xD000D0044000200A, 0x050D004100200010, 0x001000808010A800,
+    0x2220050100280090, 0x0000340080800200, 0x0080620080800100, 0x820000820025014C,
+    0x0008814000800021, 0x4802A01008400040, 0x080084E004801000, 0x0000080080801000,
+    0x0102800402800800, 0x0021008209000400, 0x09D0021004002811, 0x01000100DA000084,
+    0x0140048041228000, 0x1A21442010014000, 0x00404100A0050010, 0x00001020C202000A,
+    0x2040080005010010, 0x0A02000804220010, 0x88100830021C0001, 0x0040005400820007,
+    0x0045208000410100, 0x4185400281200080, 0x4000802000100080, 0x4091000A20100100,
+    0x0000050050280100, 0x8000060084008080, 0x2022001198040200, 0x1006008041040200,
+    0x8001800291002049, 0x8809048014400021, 0x10014A0020108042, 0x0000100005002019,
+    0x004A00500420881A, 0x3009000C00480213, 0x200A000501C80402, 0x4009000202204081,
+]
+
+BISHOP_MAGICS = [
+    0x00D0920084028200, 0x0044015802108040, 0x0830888089060100, 0x002C104200400000,
+    0x200404A202080800, 0x00082C0C20390000, 0x08C8C80208A00000, 0x0000842801100810,
+    0x0041201202080110, 0x00000C1800811200, 0x0901900302451060, 0x2800240428800208,
+    0x0022411040101010, 0x10000C8210400814, 0x8206018250462000, 0xC20000820109A002,
+    0x01300120208A00A4, 0x0C60040408024040, 0x0082150504010202, 0x0024208202060002,
+    0x800810050140090C, 0x4001000081C14002, 0x100426020A110430, 0x8014608111082200,
+    0x880C100040020880, 0x801010084A025209, 0x0600900108104010, 0x2008080124202020,
+    0x8830101001004002, 0x12A0810082005602, 0x0601211002080100, 0x0040A20000820080,
+    0x0001207000200C21, 0x080808844222040A, 0x3804006080040100, 0x0010120081780180,
+    0x1020080410018200, 0x0201004700220101, 0x0048020400118688, 0x0809024081410C02,
+    0x0004040208004000, 0x8206C10410022041, 0x4800201410020200, 0x0000042018000100,
+    0x41010201A4010600, 0x1008249004110480, 0x0002460405030400, 0x200A0A045A000100,
+    0x0101041304420024, 0x0902104202100000, 0x0030304044100002, 0x0400010042088080,
+    0x02010C4810240001, 0x0090941004484004, 0x0010107004828000, 0x0820420200510000,
+    0x0008440148021040, 0x0000250088010800, 0x0E0801420108C805, 0x1000480041048810,
+    0x0800400050060203, 0x2020020E08102108, 0x0000900202180202, 0x0044901002002040,
+]
+
+
+def step_attacks(offsets):
+    attacks = [0] * 64
+    for position in range(64):
+        row, col = divmod(position, 8)
+        for dr, dc in offsets:
+            new_row, new_col = row + dr, col + dc
+            if 0 <= new_row < 8 and 0 <= new_col < 8:
+                attacks[position] |= (1 << (new_row * 8 + new_col))
+    return attacks
+
+def ray_attacks(position, occupied, directions):
+    # Slow reference walk, only used to fill the magic tables
+    attacks = 0
+    row, col = divmod(position, 8)
+    for dr, dc in directions:
+        r, c = row + dr, col + dc
+        while 0 <= r < 8 and 0 <= c < 8:
+            attacks |= (1 << (r * 8 + c))
+            if occupied & (1 << (r * 8 + c)):
+                break
+            r += dr
+            c += dc
+    return attacks
+
+def relevant_mask(position, directions):
+    # Squares whose occupancy can change the attack set (board edges excluded)
+    mask = 0
+    row, col = divmod(position, 8)
+    for dr, dc in directions:
+        r, c = row + dr, col + dc
+        while 0 <= r + dr < 8 and 0 <= c + dc < 8:
+            mask |= (1 << (r * 8 + c))
+            r += dr
+            c += dc
+    return mask
+
+def build_magic_tables(magics, directions):
+    masks, shifts, tables = [], [], []
+    for position in range(64):
+        mask = relevant_mask(position, directions)
+        shift = 64 - bin(mask).count('1')
+        magic = magics[position]
+        table = [0] * (1 << (64 - shift))
+        # Enumerate every subset of the mask (Carry-Rippler trick)
+        subset = 0
+        while True:
+            table[((subset * magic) & MASK64) >> shift] = ray_attacks(position, subset, directions)
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        masks.append(mask)
+        shifts.append(shift)
+        tables.append(table)
+    return masks, shifts, tables
+
+KNIGHT_ATTACKS = step_attacks([(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)])
+KING_ATTACKS = step_attacks([(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)])
+# White pawns move towards row 0, black pawns towards row 7
+PAWN_ATTACKS = {
+    'white': step_attacks([(-1, -1), (-1, 1)]),
+    'black': step_attacks([(1, -1), (1, 1)]),
+}
+
+def between_squares():
+    # between[a][b]: squares strictly between two squares on a shared line
+    between = [[0] * 64 for _ in range(64)]
+    for position in range(64):
+        row, col = divmod(position, 8)
+        for dr, dc in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            squares = 0
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                between[position][r * 8 + c] = squares
+                squares |= (1 << (r * 8 + c))
+                r += dr
+                c += dc
+    return between
+
+BETWEEN = between_squares()
+
+ROOK_MASKS, ROOK_SHIFTS, ROOK_TABLES = build_magic_tables(ROOK_MAGICS, ROOK_DIRECTIONS)
+BISHOP_MASKS, BISHOP_SHIFTS, BISHOP_TABLES = build_magic_tables(BISHOP_MAGICS, BISHOP_DIRECTIONS)
+
+def rook_attacks(position, occupied):
+    return ROOK_TABLES[position][(((occupied & ROOK_MASKS[position]) * ROOK_MAGICS[position]) & MASK64) >> ROOK_SHIFTS[position]]
+
+def bishop_attacks(position, occupied):
+    return BISHOP_TABLES[position][(((occupied & BISHOP_MASKS[position]) * BISHOP_MAGICS[position]) & MASK64) >> BISHOP_SHIFTS[position]]
+
+def queen_attacks(position, occupied):
+    return rook_attacks(position, occupied) | bishop_attacks(position, occupied)
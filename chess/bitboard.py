@@ -1,191 +1,424 @@
+from collections import namedtuple
 from .pieces import Pawn, Rook, Knight, Bishop, Queen, King
+from .attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, bishop_attacks, rook_attacks, queen_attacks
+from .zobrist import (PIECE_KEYS, CASTLING_KEYS, EN_PASSANT_KEYS, WHITE_TO_MOVE_KEY, CASTLING_RIGHTS_MASK,
+                      WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE, ALL_CASTLING_RIGHTS)
+from .psqt import MATERIAL, PSQT, PIECE_VALUES
+
+# Piece codes index self.bitboards and fill the mailbox: the piece type plus
+# six for black, so code // 6 is the colour index and code % 6 the type
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+(WHITE_PAWN, WHITE_KNIGHT, WHITE_BISHOP, WHITE_ROOK, WHITE_QUEEN, WHITE_KING,
+ BLACK_PAWN, BLACK_KNIGHT, BLACK_BISHOP, BLACK_ROOK, BLACK_QUEEN, BLACK_KING) = range(12)
+PIECE_SYMBOLS = 'PNBRQKpnbrqk'
+PIECE_CODES = {symbol: code for code, symbol in enumerate(PIECE_SYMBOLS)}
+COLOR_INDEX = {'white': 0, 'black': 1}
+COLORS = ['white', 'black']
+ALL_SQUARES = (1 << 64) - 1
+
+# Game result for the side to move, computed together with its legal moves
+ONGOING, CHECKMATE, STALEMATE = 'ongoing', 'checkmate', 'stalemate'
+PositionStatus = namedtuple('PositionStatus', ['moves', 'in_check', 'result'])
+STATUS_CACHE_SIZE = 4096
 
 class BitboardChessBoard:
-    def __init__(self, flipped=False):
-        # Initialize bitboards for each piece type and color
-        self.bitboards = {
-            'P': 0, 'N': 0, 'B': 0, 'R': 0, 'Q': 0, 'K': 0,  # White pieces
-            'p': 0, 'n': 0, 'b': 0, 'r': 0, 'q': 0, 'k': 0   # Black pieces
-        }
+    def __init__(self, flipped=False, empty=False):
+        # Initialize bitboards for each piece code
+        self.bitboards = [0] * 12
+        self.mailbox = [None] * 64  # Piece code on each square
+        self.color_occupancy = [0, 0]  # White and black occupied squares
         self.occupied = 0  # All occupied squares
-        self.king_moved = {'white': False, 'black': False}
-        self.rook_moved = {'white': [False, False], 'black': [False, False]}
+        self.side_to_move = 'white'
+        self.castling_rights = 0 if empty else ALL_CASTLING_RIGHTS
+        self.en_passant = None  # Square a pawn can capture onto en passant
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.zobrist_key = WHITE_TO_MOVE_KEY ^ CASTLING_KEYS[self.castling_rights]
+        self.pawn_key = 0  # Zobrist key of the pawns alone
+        # Running material and piece-square totals, white minus black
+        self.material_score = 0
+        self.psqt_score = 0
         self.last_move = None
         self.move_history = []
-        self.setup_initial_position(flipped)
-
-        # Precomputed move bitboards for knights and kings
-        self.knight_moves = self.precompute_knight_moves()
-        self.king_moves = self.precompute_king_moves()
-
-    def precompute_knight_moves(self):
-        knight_moves = [0] * 64
-        for position in range(64):
-            moves = 0
-            row, col = divmod(position, 8)
-            knight_offsets = [
-                (2, 1), (2, -1), (-2, 1), (-2, -1),
-                (1, 2), (1, -2), (-1, 2), (-1, -2)
-            ]
-            for dr, dc in knight_offsets:
-                new_row, new_col = row + dr, col + dc
-                if 0 <= new_row < 8 and 0 <= new_col < 8:
-                    moves |= (1 << (new_row * 8 + new_col))
-            knight_moves[position] = moves
-        return knight_moves
-
-    def precompute_king_moves(self):
-        king_moves = [0] * 64
-        for position in range(64):
-            moves = 0
-            row, col = divmod(position, 8)
-            king_offsets = [
-                (1, 0), (-1, 0), (0, 1), (0, -1),
-                (1, 1), (1, -1), (-1, 1), (-1, -1)
-            ]
-            for dr, dc in king_offsets:
-                new_row, new_col = row + dr, col + dc
-                if 0 <= new_row < 8 and 0 <= new_col < 8:
-                    moves |= (1 << (new_row * 8 + new_col))
-            king_moves[position] = moves
-        return king_moves
+        self.status_cache = {}
+        if not empty:
+            self.setup_initial_position(flipped)
+
+        # Precomputed move bitboards for knights and kings (shared module tables)
+        self.knight_moves = KNIGHT_ATTACKS
+        self.king_moves = KING_ATTACKS
 
     def setup_initial_position(self, flipped):
-        if not flipped:
-            # White pieces at the bottom
-            self.set_piece('R', 0)
-            self.set_piece('N', 1)
-            self.set_piece('B', 2)
-            self.set_piece('Q', 3)
-            self.set_piece('K', 4)
-            self.set_piece('B', 5)
-            self.set_piece('N', 6)
-            self.set_piece('R', 7)
-            for i in range(8, 16):
-                self.set_piece('P', i)
-            for i in range(48, 56):
-                self.set_piece('p', i)
-            self.set_piece('r', 56)
-            self.set_piece('n', 57)
-            self.set_piece('b', 58)
-            self.set_piece('q', 59)
-            self.set_piece('k', 60)
-            self.set_piece('b', 61)
-            self.set_piece('n', 62)
-            self.set_piece('r', 63)
-        else:
-            # Black pieces at the bottom
-            self.set_piece('r', 0)
-            self.set_piece('n', 1)
-            self.set_piece('b', 2)
-            self.set_piece('q', 3)
-            self.set_piece('k', 4)
-            self.set_piece('b', 5)
-            self.set_piece('n', 6)
-            self.set_piece('r', 7)
-            for i in range(8, 16):
-                self.set_piece('p', i)
-            for i in range(48, 56):
-                self.set_piece('P', i)
-            self.set_piece('R', 56)
-            self.set_piece('N', 57)
-            self.set_piece('B', 58)
-            self.set_piece('Q', 59)
-            self.set_piece('K', 60)
-            self.set_piece('B', 61)
-            self.set_piece('N', 62)
-            self.set_piece('R', 63)
+        # The bitboard is always stored with white on rows 6-7 moving towards
+        # row 0; flipping is a display concern of ChessBoard
+        back_rank = [ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK]
+        for col, piece_type in enumerate(back_rank):
+            self.set_piece(piece_type + 6, col)
+            self.set_piece(piece_type, 56 + col)
+        for col in range(8):
+            self.set_piece(BLACK_PAWN, 8 + col)
+            self.set_piece(WHITE_PAWN, 48 + col)
 
     def set_piece(self, piece, position):
-        self.bitboards[piece] |= (1 << position)
-        self.occupied |= (1 << position)
+        bit = 1 << position
+        self.bitboards[piece] |= bit
+        self.color_occupancy[piece // 6] |= bit
+        self.occupied |= bit
+        self.mailbox[position] = piece
+        self.zobrist_key ^= PIECE_KEYS[piece][position]
+        if piece % 6 == PAWN:
+            self.pawn_key ^= PIECE_KEYS[piece][position]
+        self.material_score += MATERIAL[piece]
+        self.psqt_score += PSQT[piece][position]
 
     def clear_piece(self, piece, position):
-        self.bitboards[piece] &= ~(1 << position)
-        self.occupied &= ~(1 << position)
+        bit = ~(1 << position)
+        self.bitboards[piece] &= bit
+        self.color_occupancy[piece // 6] &= bit
+        self.occupied &= bit
+        self.mailbox[position] = None
+        self.zobrist_key ^= PIECE_KEYS[piece][position]
+        if piece % 6 == PAWN:
+            self.pawn_key ^= PIECE_KEYS[piece][position]
+        self.material_score -= MATERIAL[piece]
+        self.psqt_score -= PSQT[piece][position]
 
     def move_piece(self, piece, start, end):
         self.clear_piece(piece, start)
         self.set_piece(piece, end)
 
     def get_piece_at(self, position):
-        for piece, bitboard in self.bitboards.items():
-            if bitboard & (1 << position):
-                return piece
-        return None
-
-    def update_board(self, start, end):
-        piece = self.get_piece_at(start)
-        if piece:
-            self.move_piece(piece, start, end)
-            self.last_move = (start, end)
-            self.move_history.append((start, end, piece))
+        return self.mailbox[position]
+
+    def snapshot(self):
+        # Immutable, picklable copy of the position (no move history)
+        return (tuple(self.bitboards), self.side_to_move, self.castling_rights, self.en_passant,
+                self.halfmove_clock, self.fullmove_number, self.zobrist_key)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        bitboards, side_to_move, castling_rights, en_passant, halfmove_clock, fullmove_number, zobrist_key = snapshot
+        board = cls(empty=True)
+        board.bitboards = list(bitboards)
+        for piece, bitboard in enumerate(bitboards):
+            board.color_occupancy[piece // 6] |= bitboard
+            while bitboard:
+                position = bitboard.bit_length() - 1
+                board.mailbox[position] = piece
+                board.material_score += MATERIAL[piece]
+                board.psqt_score += PSQT[piece][position]
+                if piece % 6 == PAWN:
+                    board.pawn_key ^= PIECE_KEYS[piece][position]
+                bitboard &= ~(1 << position)
+        board.occupied = board.color_occupancy[0] | board.color_occupancy[1]
+        board.side_to_move = side_to_move
+        board.castling_rights = castling_rights
+        board.en_passant = en_passant
+        board.halfmove_clock = halfmove_clock
+        board.fullmove_number = fullmove_number
+        board.zobrist_key = zobrist_key
+        return board
+
+    def clone(self):
+        return self.from_snapshot(self.snapshot())
+
+    @classmethod
+    def from_fen(cls, fen):
+        # Full FEN, or its first four fields with the counters left at 0 1.
+        # Ranks are looked up in a cache of parsed rank strings, which real
+        # position sets repeat heavily, so bulk loading stays cheap
+        fields = fen.split()
+        ranks = fields[0].split('/') if fields else ()
+        if len(fields) < 4 or len(ranks) != 8:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        board = cls(empty=True)
+        bitboards = board.bitboards
+        mailbox = []
+        key = material = psqt = pawn_key = 0
+        for row, text in enumerate(ranks):
+            parsed = FEN_RANK_CACHE.get((row, text))
+            if parsed is None:
+                parsed = parse_fen_rank(row, text, fen)
+            squares, pieces, rank_key, rank_pawn_key, rank_material, rank_psqt = parsed
+            mailbox += squares
+            for piece, bits in pieces:
+                bitboards[piece] |= bits
+            key ^= rank_key
+            pawn_key ^= rank_pawn_key
+            material += rank_material
+            psqt += rank_psqt
+        for king in (KING, 6 + KING):
+            kings = bitboards[king]
+            if not kings or kings & (kings - 1):
+                raise ValueError(f"FEN must have exactly one king per side: {fen!r}")
+        board.mailbox = mailbox
+        board.color_occupancy = [bitboards[0] | bitboards[1] | bitboards[2] | bitboards[3] | bitboards[4] | bitboards[5],
+                                 bitboards[6] | bitboards[7] | bitboards[8] | bitboards[9] | bitboards[10] | bitboards[11]]
+        board.occupied = board.color_occupancy[0] | board.color_occupancy[1]
+        board.pawn_key = pawn_key
+        board.material_score = material
+        board.psqt_score = psqt
+
+        if fields[1] not in ('w', 'b'):
+            raise ValueError(f"Invalid side to move in FEN: {fen!r}")
+        board.side_to_move = 'white' if fields[1] == 'w' else 'black'
+        rights = FEN_CASTLING_RIGHTS.get(fields[2])
+        if rights is None:
+            raise ValueError(f"Invalid castling rights in FEN: {fen!r}")
+        board.castling_rights = rights
+        if fields[3] != '-':
+            if fields[3] not in FEN_SQUARES:
+                raise ValueError(f"Invalid en passant square in FEN: {fen!r}")
+            target = FEN_SQUARES[fields[3]]
+            # Like update_board, only keep a square a pawn can capture onto
+            mover = COLOR_INDEX[board.side_to_move]
+            if PAWN_ATTACKS[COLORS[1 - mover]][target] & bitboards[6 * mover + PAWN]:
+                board.en_passant = target
+                key ^= EN_PASSANT_KEYS[target % 8]
+        if len(fields) >= 6:
+            try:
+                board.halfmove_clock = int(fields[4])
+                board.fullmove_number = int(fields[5])
+            except ValueError:
+                raise ValueError(f"Invalid move counters in FEN: {fen!r}") from None
+        key ^= CASTLING_KEYS[rights]
+        if board.side_to_move == 'white':
+            key ^= WHITE_TO_MOVE_KEY
+        board.zobrist_key = key
+        return board
+
+    def to_fen(self):
+        ranks = []
+        for row in range(0, 64, 8):
+            text = ''
+            empty = 0
+            for piece in self.mailbox[row:row + 8]:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += PIECE_SYMBOLS[piece]
+            ranks.append(text + str(empty) if empty else text)
+        castling = ''.join(symbol for symbol, right in zip('KQkq', (WHITE_KINGSIDE, WHITE_QUEENSIDE,
+                                                                   BLACK_KINGSIDE, BLACK_QUEENSIDE))
+                           if self.castling_rights & right) or '-'
+        en_passant = '-' if self.en_passant is None else SQUARE_NAMES[self.en_passant]
+        return (f"{'/'.join(ranks)} {'w' if self.side_to_move == 'white' else 'b'} {castling} {en_passant} "
+                f"{self.halfmove_clock} {self.fullmove_number}")
+
+    def compute_zobrist_key(self):
+        # Full recomputation; update_board and undo_move keep the key incrementally
+        key = CASTLING_KEYS[self.castling_rights]
+        for position, piece in enumerate(self.mailbox):
+            if piece is not None:
+                key ^= PIECE_KEYS[piece][position]
+        if self.en_passant is not None:
+            key ^= EN_PASSANT_KEYS[self.en_passant % 8]
+        if self.side_to_move == 'white':
+            key ^= WHITE_TO_MOVE_KEY
+        return key
+
+    def update_board(self, start, end, promotion=None):
+        piece = self.mailbox[start]
+        if piece is None:
+            return
+        captured = self.mailbox[end]
+        self.move_history.append((start, end, piece, captured, promotion, self.castling_rights,
+                                  self.en_passant, self.halfmove_clock, self.zobrist_key))
+        piece_type = piece % 6
+        color_index = piece // 6
+
+        if captured is not None:
+            self.clear_piece(captured, end)
+        elif piece_type == PAWN and end == self.en_passant:
+            # En passant: the captured pawn sits behind the target square
+            self.clear_piece(piece + 6 - 12 * color_index, end + 8 - 16 * color_index)
+        self.move_piece(piece, start, end)
+        if promotion is not None:
+            self.clear_piece(piece, end)
+            self.set_piece(promotion, end)
+
+        # Castling also moves the rook next to the king
+        if piece_type == KING and abs(end - start) == 2:
+            rook_start, rook_end = (end + 1, end - 1) if end > start else (end - 2, end + 1)
+            self.move_piece(self.mailbox[rook_start], rook_start, rook_end)
+
+        key = self.zobrist_key
+        rights = self.castling_rights & CASTLING_RIGHTS_MASK[start] & CASTLING_RIGHTS_MASK[end]
+        if rights != self.castling_rights:
+            key ^= CASTLING_KEYS[self.castling_rights] ^ CASTLING_KEYS[rights]
+            self.castling_rights = rights
+        if self.en_passant is not None:
+            key ^= EN_PASSANT_KEYS[self.en_passant % 8]
+            self.en_passant = None
+        # Only record an en passant square an enemy pawn could actually use
+        if piece_type == PAWN and abs(end - start) == 16:
+            middle = (start + end) // 2
+            if PAWN_ATTACKS[COLORS[color_index]][middle] & self.bitboards[piece + 6 - 12 * color_index]:
+                self.en_passant = middle
+                key ^= EN_PASSANT_KEYS[middle % 8]
+
+        self.halfmove_clock = 0 if piece_type == PAWN or captured is not None else self.halfmove_clock + 1
+        if self.side_to_move == 'black':
+            self.fullmove_number += 1
+        self.side_to_move = 'black' if self.side_to_move == 'white' else 'white'
+        self.zobrist_key = key ^ WHITE_TO_MOVE_KEY
+        self.last_move = (start, end)
 
     def undo_move(self):
         if not self.move_history:
             return
 
-        start, end, piece = self.move_history.pop()
+        start, end, piece, captured, promotion, castling_rights, en_passant, halfmove_clock, zobrist_key = self.move_history.pop()
+        color_index = piece // 6
+        if promotion is not None:
+            self.clear_piece(promotion, end)
+            self.set_piece(piece, end)
         self.move_piece(piece, end, start)
-        self.clear_piece(piece, end)
-        self.last_move = None if not self.move_history else self.move_history[-1]
+        if captured is not None:
+            self.set_piece(captured, end)
+        elif piece % 6 == PAWN and end == en_passant:
+            self.set_piece(piece + 6 - 12 * color_index, end + 8 - 16 * color_index)
+
+        if piece % 6 == KING and abs(end - start) == 2:
+            rook_start, rook_end = (end + 1, end - 1) if end > start else (end - 2, end + 1)
+            self.move_piece(self.mailbox[rook_end], rook_end, rook_start)
+
+        self.castling_rights = castling_rights
+        self.en_passant = en_passant
+        self.halfmove_clock = halfmove_clock
+        self.side_to_move = 'black' if self.side_to_move == 'white' else 'white'
+        if self.side_to_move == 'black':
+            self.fullmove_number -= 1
+        self.zobrist_key = zobrist_key
+        self.last_move = None if not self.move_history else self.move_history[-1][:2]
+
+    def make_null_move(self):
+        # Pass the turn without moving, for null-move pruning in search;
+        # taken back with undo_null_move rather than undo_move
+        self.move_history.append((None, None, None, None, None, self.castling_rights,
+                                  self.en_passant, self.halfmove_clock, self.zobrist_key))
+        key = self.zobrist_key
+        if self.en_passant is not None:
+            key ^= EN_PASSANT_KEYS[self.en_passant % 8]
+            self.en_passant = None
+        self.halfmove_clock += 1
+        if self.side_to_move == 'black':
+            self.fullmove_number += 1
+        self.side_to_move = 'black' if self.side_to_move == 'white' else 'white'
+        self.zobrist_key = key ^ WHITE_TO_MOVE_KEY
+        self.last_move = None
+
+    def undo_null_move(self):
+        _, _, _, _, _, _, en_passant, halfmove_clock, zobrist_key = self.move_history.pop()
+        self.en_passant = en_passant
+        self.halfmove_clock = halfmove_clock
+        self.side_to_move = 'black' if self.side_to_move == 'white' else 'white'
+        if self.side_to_move == 'black':
+            self.fullmove_number -= 1
+        self.zobrist_key = zobrist_key
+        self.last_move = None if not self.move_history else self.move_history[-1][:2]
 
     def is_square_attacked(self, position, color):
-        opponent_pieces = ['p', 'n', 'b', 'r', 'q', 'k'] if color == 'white' else ['P', 'N', 'B', 'R', 'Q', 'K']
-        
+        opponent = 6 - 6 * COLOR_INDEX[color]  # First piece code of the other side
+        bitboards = self.bitboards
+
         # Check for knight attacks
-        knight_moves = self.knight_moves[position]
-        if knight_moves & self.bitboards[opponent_pieces[1]]:  # Check against opponent knights
+        if self.knight_moves[position] & bitboards[opponent + KNIGHT]:
             return True
 
         # Check for king attacks
-        king_moves = self.king_moves[position]
-        if king_moves & self.bitboards[opponent_pieces[5]]:  # Check against opponent king
+        if self.king_moves[position] & bitboards[opponent + KING]:
             return True
 
-        # Check for pawn attacks
-        pawn_attack_offsets = [-9, -7] if color == 'white' else [7, 9]
-        for offset in pawn_attack_offsets:
-            attack_pos = position + offset
-            if 0 <= attack_pos < 64 and self.bitboards[opponent_pieces[0]] & (1 << attack_pos):
-                return True
+        # Check for pawn attacks: an enemy pawn attacks us from the squares
+        # our own pawn would attack from here
+        if PAWN_ATTACKS[color][position] & bitboards[opponent + PAWN]:
+            return True
 
         # Check for sliding piece attacks (bishops, rooks, queens)
-        for direction in [9, 7, -9, -7, 8, -8, 1, -1]:
-            current_pos = position
-            while True:
-                current_pos += direction
-                if not (0 <= current_pos < 64) or (current_pos % 8 == 0 and direction in [7, -9, -1]) or (current_pos % 8 == 7 and direction in [9, -7, 1]):
-                    break
-                if self.occupied & (1 << current_pos):
-                    piece = self.get_piece_at(current_pos)
-                    if piece in opponent_pieces[2:5]:  # Check against bishops, rooks, queens
-                        return True
-                    break
+        queens = bitboards[opponent + QUEEN]
+        if bishop_attacks(position, self.occupied) & (bitboards[opponent + BISHOP] | queens):
+            return True
+        if rook_attacks(position, self.occupied) & (bitboards[opponent + ROOK] | queens):
+            return True
 
         return False
 
+    def attackers_to(self, position, occupied):
+        # Pieces of both colours attacking a square, given an occupancy
+        bitboards = self.bitboards
+        queens = bitboards[WHITE_QUEEN] | bitboards[BLACK_QUEEN]
+        return ((PAWN_ATTACKS['white'][position] & bitboards[BLACK_PAWN])
+                | (PAWN_ATTACKS['black'][position] & bitboards[WHITE_PAWN])
+                | (KNIGHT_ATTACKS[position] & (bitboards[WHITE_KNIGHT] | bitboards[BLACK_KNIGHT]))
+                | (KING_ATTACKS[position] & (bitboards[WHITE_KING] | bitboards[BLACK_KING]))
+                | (bishop_attacks(position, occupied) & (bitboards[WHITE_BISHOP] | bitboards[BLACK_BISHOP] | queens))
+                | (rook_attacks(position, occupied) & (bitboards[WHITE_ROOK] | bitboards[BLACK_ROOK] | queens)))
+
+    def static_exchange(self, start, end):
+        # Static exchange evaluation: the material the side moving from start
+        # wins on end if both sides keep recapturing with their least
+        # valuable attacker, each free to stop when going on would lose.
+        # Sliders behind a capturer join in as the occupancy empties
+        bitboards = self.bitboards
+        piece = self.mailbox[start]
+        target = self.mailbox[end]
+        occupied = self.occupied & ~(1 << start)
+        if target is not None:
+            gain = [PIECE_VALUES[target % 6]]
+        elif piece % 6 == PAWN and end == self.en_passant:
+            gain = [PIECE_VALUES[PAWN]]
+            occupied &= ~(1 << (end + 8 - 16 * (piece // 6)))
+        else:
+            gain = [0]
+        attacker_value = PIECE_VALUES[piece % 6]
+        side = 1 - piece // 6
+        attackers = self.attackers_to(end, occupied) & occupied
+        while True:
+            own = attackers & self.color_occupancy[side]
+            if not own:
+                break
+            for piece_type in range(6):
+                candidates = own & bitboards[6 * side + piece_type]
+                if candidates:
+                    break
+            # Recapturing wins the piece standing on the square
+            gain.append(attacker_value - gain[-1])
+            if max(-gain[-2], gain[-1]) < 0:
+                gain.pop()  # This recapture cannot pay whatever follows
+                break
+            attacker_value = PIECE_VALUES[piece_type]
+            occupied &= ~(candidates & -candidates)
+            attackers = self.attackers_to(end, occupied) & occupied
+            side = 1 - side
+        # Each side only continues the exchange when that pays
+        for index in range(len(gain) - 1, 0, -1):
+            gain[index - 1] = -max(-gain[index - 1], gain[index])
+        return gain[0]
+
+    def get_status(self, color):
+        # Legal moves, check state and result in one pass, memoised per key.
+        # The move tuple is shared between callers and must not be mutated
+        cache_key = (self.zobrist_key, color)
+        status = self.status_cache.get(cache_key)
+        if status is None:
+            moves = tuple(self.generate_legal_moves(color))
+            in_check = self.is_in_check(color)
+            result = ONGOING if moves else (CHECKMATE if in_check else STALEMATE)
+            status = PositionStatus(moves, in_check, result)
+            if len(self.status_cache) >= STATUS_CACHE_SIZE:
+                self.status_cache.clear()
+            self.status_cache[cache_key] = status
+        return status
+
     def is_checkmate(self, color):
-        if not self.is_in_check(color):
-            return False
-        for move in self.generate_moves(color):
-            self.update_board(*move)
-            if not self.is_in_check(color):
-                self.undo_move()
-                return False
-            self.undo_move()
-        return True
+        return self.get_status(color).result == CHECKMATE
 
     def is_stalemate(self, color):
-        if self.is_in_check(color):
-            return False
-        for move in self.generate_moves(color):
-            self.update_board(*move)
-            if not self.is_in_check(color):
-                self.undo_move()
-                return False
-            self.undo_move()
-        return True
+        return self.get_status(color).result == STALEMATE
 
     def is_in_check(self, color):
         king_position = self.find_king(color)
@@ -194,49 +427,159 @@ class BitboardChessBoard:
         return self.is_square_attacked(king_position, color)
 
     def find_king(self, color):
-        king_symbol = 'K' if color == 'white' else 'k'
-        king_bitboard = self.bitboards[king_symbol]
+        king_bitboard = self.bitboards[KING + 6 * COLOR_INDEX[color]]
         if king_bitboard:
             return king_bitboard.bit_length() - 1
         return None
 
     def generate_castling_moves(self, color):
         moves = []
-        row = 0 if color == 'white' else 7
-        king_position = self.find_king(color)
+        if color == 'white':
+            king_position, kingside, queenside = 60, WHITE_KINGSIDE, WHITE_QUEENSIDE
+        else:
+            king_position, kingside, queenside = 4, BLACK_KINGSIDE, BLACK_QUEENSIDE
+        if not self.castling_rights & (kingside | queenside) or self.is_square_attacked(king_position, color):
+            return moves
+
+        # Kingside castling
+        if self.castling_rights & kingside and not self.occupied & (0b11 << (king_position + 1)):
+            if not self.is_square_attacked(king_position + 1, color) and not self.is_square_attacked(king_position + 2, color):
+                moves.append((king_position, king_position + 2))
 
-        if not self.king_moved[color]:
-            # Kingside castling
-            if not self.rook_moved[color][1] and not self.occupied & (1 << (king_position + 1)) and not self.occupied & (1 << (king_position + 2)):
-                if not self.is_square_attacked(king_position, color) and not self.is_square_attacked(king_position + 1, color) and not self.is_square_attacked(king_position + 2, color):
-                    moves.append((king_position, king_position + 2))
+        # Queenside castling
+        if self.castling_rights & queenside and not self.occupied & (0b111 << (king_position - 3)):
+            if not self.is_square_attacked(king_position - 1, color) and not self.is_square_attacked(king_position - 2, color):
+                moves.append((king_position, king_position - 2))
 
-            # Queenside castling
-            if not self.rook_moved[color][0] and not self.occupied & (1 << (king_position - 1)) and not self.occupied & (1 << (king_position - 2)) and not self.occupied & (1 << (king_position - 3)):
-                if not self.is_square_attacked(king_position, color) and not self.is_square_attacked(king_position - 1, color) and not self.is_square_attacked(king_position - 2, color):
-                    moves.append((king_position, king_position - 2))
+        return moves
+
+    def generate_legal_moves(self, color):
+        # Strictly legal moves, computed from the checkers and pinned pieces
+        # of the position instead of playing and taking back every candidate
+        us = COLOR_INDEX[color]
+        first_code, enemy_code = 6 * us, 6 - 6 * us
+        bitboards = self.bitboards
+        if not bitboards[first_code + KING]:
+            return self.generate_moves(color)
+        king = bitboards[first_code + KING].bit_length() - 1
+        own, opponent = self.color_occupancy[us], self.color_occupancy[1 - us]
+        occupied = self.occupied
+        moves = []
+
+        # King moves, tested with the king lifted off the board so it cannot
+        # shield the square behind it from a slider it is moving away from
+        without_king = occupied & ~(1 << king)
+        targets = KING_ATTACKS[king] & ~own
+        while targets:
+            target = targets.bit_length() - 1
+            if not self.attackers_to(target, without_king) & opponent:
+                moves.append((king, target))
+            targets &= ~(1 << target)
+
+        checkers = self.attackers_to(king, occupied) & opponent
+        if checkers & (checkers - 1):
+            return moves  # Double check: only the king can move
+        if checkers:
+            # Capture the checker or block its ray
+            evasion_mask = checkers | BETWEEN[king][checkers.bit_length() - 1]
+        else:
+            evasion_mask = ALL_SQUARES
+            moves.extend(self.generate_castling_moves(color))
+
+        # A lone friendly piece between the king and an enemy slider is pinned
+        # to that line
+        enemy_diagonal = bitboards[enemy_code + BISHOP] | bitboards[enemy_code + QUEEN]
+        enemy_straight = bitboards[enemy_code + ROOK] | bitboards[enemy_code + QUEEN]
+        pin_rays = {}
+        snipers = (bishop_attacks(king, opponent) & enemy_diagonal) | (rook_attacks(king, opponent) & enemy_straight)
+        while snipers:
+            sniper = snipers.bit_length() - 1
+            blockers = BETWEEN[king][sniper] & occupied
+            if blockers & own and not blockers & (blockers - 1):
+                pin_rays[blockers.bit_length() - 1] = BETWEEN[king][sniper] | (1 << sniper)
+            snipers &= ~(1 << sniper)
+
+        allowed = ~own & evasion_mask
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN):
+            bitboard = bitboards[first_code + piece_type]
+            while bitboard:
+                position = bitboard.bit_length() - 1
+                if piece_type == KNIGHT:
+                    attacks = KNIGHT_ATTACKS[position]
+                elif piece_type == BISHOP:
+                    attacks = bishop_attacks(position, occupied)
+                elif piece_type == ROOK:
+                    attacks = rook_attacks(position, occupied)
+                else:
+                    attacks = queen_attacks(position, occupied)
+                targets = attacks & allowed
+                if position in pin_rays:
+                    targets &= pin_rays[position]
+                while targets:
+                    target = targets.bit_length() - 1
+                    moves.append((position, target))
+                    targets &= ~(1 << target)
+                bitboard &= ~(1 << position)
+
+        # Pawns
+        direction = -8 if us == 0 else 8
+        start_row = 6 if us == 0 else 1
+        promotion_row = 0 if us == 0 else 7
+        pawn_attacks = PAWN_ATTACKS[color]
+        bitboard = bitboards[first_code + PAWN]
+        while bitboard:
+            position = bitboard.bit_length() - 1
+            bitboard &= ~(1 << position)
+            mask = evasion_mask & pin_rays.get(position, ALL_SQUARES)
+            targets = 0
+            single = position + direction
+            if not occupied & (1 << single):
+                targets |= 1 << single
+                double = single + direction
+                if position // 8 == start_row and not occupied & (1 << double):
+                    targets |= 1 << double
+            targets |= pawn_attacks[position] & opponent
+            targets &= mask
+            while targets:
+                target = targets.bit_length() - 1
+                if target // 8 == promotion_row:
+                    for promotion in (first_code + QUEEN, first_code + ROOK, first_code + BISHOP, first_code + KNIGHT):
+                        moves.append((position, target, promotion))
+                else:
+                    moves.append((position, target))
+                targets &= ~(1 << target)
+
+            if self.en_passant is not None and pawn_attacks[position] & (1 << self.en_passant):
+                captured = self.en_passant - direction
+                if mask & ((1 << self.en_passant) | (1 << captured)):
+                    # Both pawns leave their squares at once, which can expose
+                    # the king along a rank; replay the occupancy to be sure
+                    after = (occupied & ~(1 << position) & ~(1 << captured)) | (1 << self.en_passant)
+                    if not (bishop_attacks(king, after) & enemy_diagonal or rook_attacks(king, after) & enemy_straight):
+                        moves.append((position, self.en_passant))
 
         return moves
 
     def generate_moves(self, color):
         moves = []
-        piece_types = ['P', 'N', 'B', 'R', 'Q', 'K'] if color == 'white' else ['p', 'n', 'b', 'r', 'q', 'k']
+        first_code = 6 * COLOR_INDEX[color]
 
-        for piece in piece_types:
+        for piece in range(first_code, first_code + 6):
             bitboard = self.bitboards[piece]
+            piece_type = piece - first_code
             while bitboard:
                 position = bitboard.bit_length() - 1
-                if piece.lower() == 'p':
+                if piece_type == PAWN:
                     moves.extend(self.generate_pawn_moves(position, color))
-                elif piece.lower() == 'n':
+                elif piece_type == KNIGHT:
                     moves.extend(self.generate_knight_moves(position))
-                elif piece.lower() == 'b':
+                elif piece_type == BISHOP:
                     moves.extend(self.generate_bishop_moves(position))
-                elif piece.lower() == 'r':
+                elif piece_type == ROOK:
                     moves.extend(self.generate_rook_moves(position))
-                elif piece.lower() == 'q':
+                elif piece_type == QUEEN:
                     moves.extend(self.generate_queen_moves(position))
-                elif piece.lower() == 'k':
+                elif piece_type == KING:
                     moves.extend(self.generate_king_moves(position))
                 bitboard &= ~(1 << position)
 
@@ -258,70 +601,51 @@ class BitboardChessBoard:
             if (position // 8) == start_row and not self.occupied & (1 << (position + 2 * direction)):
                 moves.append((position, position + 2 * direction))
 
-        # Captures
-        for capture_direction in [-9, -7] if color == 'white' else [7, 9]:
-            capture_pos = position + capture_direction
-            if 0 <= capture_pos < 64 and self.occupied & (1 << capture_pos):
-                if self.get_piece_at(capture_pos).islower() if color == 'white' else self.get_piece_at(capture_pos).isupper():
-                    moves.append((position, capture_pos))
+        # Captures, including en passant onto the empty target square
+        targets = self.color_occupancy[1 - COLOR_INDEX[color]]
+        if self.en_passant is not None:
+            targets |= 1 << self.en_passant
+        captures = PAWN_ATTACKS[color][position] & targets
+        while captures:
+            capture_pos = captures.bit_length() - 1
+            moves.append((position, capture_pos))
+            captures &= ~(1 << capture_pos)
 
         # Promotion
-        moves = [(start, end) for start, end in moves if end // 8 != promotion_row]
+        if moves and moves[0][1] // 8 == promotion_row:
+            moves = [(start, end, promotion) for start, end in moves
+                     for promotion in self.promotion_pieces(color)]
 
         return moves
 
-    def generate_knight_moves(self, position):
+    def promotion_pieces(self, color):
+        first_code = 6 * COLOR_INDEX[color]
+        return [first_code + QUEEN, first_code + ROOK, first_code + BISHOP, first_code + KNIGHT]
+
+    def generate_targets(self, position, attacks):
+        # Turn an attack set into moves, skipping squares held by the mover's side
         moves = []
-        knight_moves = self.knight_moves[position]
-        while knight_moves:
-            target = knight_moves.bit_length() - 1
-            if not self.occupied & (1 << target) or self.get_piece_at(target).islower() != self.get_piece_at(position).islower():
-                moves.append((position, target))
-            knight_moves &= ~(1 << target)
+        targets = attacks & ~self.color_occupancy[self.mailbox[position] // 6]
+        while targets:
+            target = targets.bit_length() - 1
+            moves.append((position, target))
+            targets &= ~(1 << target)
         return moves
 
+    def generate_knight_moves(self, position):
+        return self.generate_targets(position, self.knight_moves[position])
+
     def generate_bishop_moves(self, position):
-        moves = []
-        for direction in [9, 7, -9, -7]:
-            current_pos = position
-            while True:
-                current_pos += direction
-                if not (0 <= current_pos < 64) or (current_pos % 8 == 0 and direction in [7, -9]) or (current_pos % 8 == 7 and direction in [9, -7]):
-                    break
-                if self.occupied & (1 << current_pos):
-                    if self.get_piece_at(current_pos).islower() != self.get_piece_at(position).islower():
-                        moves.append((position, current_pos))
-                    break
-                moves.append((position, current_pos))
-        return moves
+        return self.generate_targets(position, bishop_attacks(position, self.occupied))
 
     def generate_rook_moves(self, position):
-        moves = []
-        for direction in [8, -8, 1, -1]:
-            current_pos = position
-            while True:
-                current_pos += direction
-                if not (0 <= current_pos < 64) or (current_pos % 8 == 0 and direction == -1) or (current_pos % 8 == 7 and direction == 1):
-                    break
-                if self.occupied & (1 << current_pos):
-                    if self.get_piece_at(current_pos).islower() != self.get_piece_at(position).islower():
-                        moves.append((position, current_pos))
-                    break
-                moves.append((position, current_pos))
-        return moves
+        return self.generate_targets(position, rook_attacks(position, self.occupied))
 
     def generate_queen_moves(self, position):
-        return self.generate_bishop_moves(position) + self.generate_rook_moves(position)
+        return self.generate_targets(position, queen_attacks(position, self.occupied))
 
     def generate_king_moves(self, position):
-        moves = []
-        king_moves = self.king_moves[position]
-        while king_moves:
-            target = king_moves.bit_length() - 1
-            if not self.occupied & (1 << target) or self.get_piece_at(target).islower() != self.get_piece_at(position).islower():
-                moves.append((position, target))
-            king_moves &= ~(1 << target)
-        return moves
+        return self.generate_targets(position, self.king_moves[position])
 
 
     def print_board(self):
@@ -329,11 +653,59 @@ class BitboardChessBoard:
             line = ""
             for file in range(8):
                 position = rank * 8 + file
-                piece = self.get_piece_at(position)
-                line += (piece if piece else '.') + " "
+                piece = self.mailbox[position]
+                line += (PIECE_SYMBOLS[piece] if piece is not None else '.') + " "
             print(line)
         print("\n")
 
+SQUARE_NAMES = ['abcdefgh'[position % 8] + str(8 - position // 8) for position in range(64)]
+FEN_SQUARES = {name: position for position, name in enumerate(SQUARE_NAMES)}
+FEN_CASTLING_RIGHTS = {'-': 0}
+for mask in range(1, 16):
+    FEN_CASTLING_RIGHTS[''.join(symbol for symbol, right in zip('KQkq', (WHITE_KINGSIDE, WHITE_QUEENSIDE,
+                                                                          BLACK_KINGSIDE, BLACK_QUEENSIDE))
+                                if mask & right)] = mask
+
+# Parsed FEN ranks keyed by (row, text); cleared when full
+FEN_RANK_CACHE = {}
+FEN_RANK_CACHE_SIZE = 1 << 16
+
+def parse_fen_rank(row, text, fen):
+    # Mailbox slice, (piece, bits) pairs and the key, pawn key, material and
+    # piece-square contributions of one FEN rank
+    squares = []
+    pieces = {}
+    key = pawn_key = material = psqt = 0
+    previous_digit = False
+    for symbol in text:
+        if symbol in '12345678':
+            # Runs of empty squares are written as one digit
+            if previous_digit:
+                raise ValueError(f"Invalid rank {text!r} in FEN: {fen!r}")
+            previous_digit = True
+            squares += [None] * int(symbol)
+            continue
+        previous_digit = False
+        piece = PIECE_CODES.get(symbol)
+        if piece is None:
+            raise ValueError(f"Invalid piece {symbol!r} in FEN: {fen!r}")
+        if len(squares) >= 8:
+            raise ValueError(f"Invalid rank {text!r} in FEN: {fen!r}")
+        position = row * 8 + len(squares)
+        squares.append(piece)
+        pieces[piece] = pieces.get(piece, 0) | 1 << position
+        key ^= PIECE_KEYS[piece][position]
+        if piece % 6 == PAWN:
+            pawn_key ^= PIECE_KEYS[piece][position]
+        material += MATERIAL[piece]
+        psqt += PSQT[piece][position]
+    if len(squares) != 8:
+        raise ValueError(f"Invalid rank {text!r} in FEN: {fen!r}")
+    if len(FEN_RANK_CACHE) >= FEN_RANK_CACHE_SIZE:
+        FEN_RANK_CACHE.clear()
+    parsed = FEN_RANK_CACHE[row, text] = (squares, tuple(pieces.items()), key, pawn_key, material, psqt)
+    return parsed
+
 def create_piece_from_symbol(symbol):
         color = 'white' if symbol.isupper() else 'black'
         symbol = symbol.lower()
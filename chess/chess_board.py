@@ -1,5 +1,13 @@
 from .pieces import Pawn, Rook, Knight, Bishop, Queen, King
-from .bitboard import BitboardChessBoard, create_piece_from_symbol
+from .bitboard import (BitboardChessBoard, create_piece_from_symbol, PIECE_CODES, PIECE_SYMBOLS, QUEEN,
+                       PositionStatus, STATUS_CACHE_SIZE, CHECKMATE, STALEMATE)
+from .zobrist import (PIECE_KEYS, CASTLING_KEYS, EN_PASSANT_KEYS, WHITE_TO_MOVE_KEY, CASTLING_RIGHTS_MASK, ALL_CASTLING_RIGHTS,
+                      WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE)
+from .psqt import MATERIAL, PSQT
+
+# Pieces carry no state beyond their colour, so boards restored from a
+# snapshot share one instance per symbol instead of allocating new ones
+SHARED_PIECES = {symbol: create_piece_from_symbol(symbol) for symbol in PIECE_SYMBOLS}
 
 class ChessBoard:
     def __init__(self, initial_state=None, flipped=False):
@@ -8,10 +16,18 @@ class ChessBoard:
         self.move_history = []  # Initialize move history
         self.king_moved = {'white': False, 'black': False}
         self.rook_moved = {'white': [False, False], 'black': [False, False]}  # [left rook, right rook]
+        self.flipped = flipped
+        self.side_to_move = 'white'
+        self.castling_rights = ALL_CASTLING_RIGHTS
+        self.en_passant = None  # (row, col) a pawn can capture onto en passant
+        self.status_cache = {}
         if initial_state:
             self.load_state(initial_state)
         else:
             self.setup_initial_position(flipped)
+            self.zobrist_key = self.compute_zobrist_key()
+            self.pawn_key = self.compute_pawn_key()
+            self.compute_scores()
 
     def setup_initial_position(self, flipped):
         if not flipped:
@@ -41,6 +57,59 @@ class ChessBoard:
 
     def load_state(self, state):
         self.board = state
+        self.zobrist_key = self.compute_zobrist_key()
+        self.pawn_key = self.compute_pawn_key()
+        self.compute_scores()
+
+    def square_index(self, row, col):
+        # Bitboard/Zobrist square of a display square; a flipped board is
+        # the same position rotated by 180 degrees
+        position = row * 8 + col
+        return 63 - position if self.flipped else position
+
+    def piece_code(self, piece):
+        return PIECE_CODES[piece.symbol] + (6 if piece.color == 'black' else 0)
+
+    def piece_key(self, piece, row, col):
+        return PIECE_KEYS[self.piece_code(piece)][self.square_index(row, col)]
+
+    def piece_square_score(self, piece, row, col):
+        return PSQT[self.piece_code(piece)][self.square_index(row, col)]
+
+    def compute_scores(self):
+        # Full recomputation of the running material and piece-square
+        # totals (white minus black) that update_board keeps incrementally
+        self.material_score = 0
+        self.psqt_score = 0
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece:
+                    self.material_score += MATERIAL[self.piece_code(piece)]
+                    self.psqt_score += self.piece_square_score(piece, row, col)
+
+    def compute_zobrist_key(self):
+        key = CASTLING_KEYS[self.castling_rights]
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece:
+                    key ^= self.piece_key(piece, row, col)
+        if self.en_passant is not None:
+            key ^= EN_PASSANT_KEYS[self.square_index(*self.en_passant) % 8]
+        if self.side_to_move == 'white':
+            key ^= WHITE_TO_MOVE_KEY
+        return key
+
+    def compute_pawn_key(self):
+        # Zobrist key of the pawns alone, for caching pawn structure terms
+        key = 0
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if isinstance(piece, Pawn):
+                    key ^= self.piece_key(piece, row, col)
+        return key
 
     def update_board(self, move):
         start, end = move
@@ -50,16 +119,28 @@ class ChessBoard:
         self.board[start[0]][start[1]] = None
 
         # Save the move to history for undoing
-        self.move_history.append((start, end, captured_piece))
+        self.move_history.append((start, end, captured_piece, self.castling_rights, self.en_passant, self.zobrist_key,
+                                  self.material_score, self.psqt_score, self.pawn_key, None))
+
+        key = self.zobrist_key ^ self.piece_key(piece, *start) ^ self.piece_key(piece, *end)
+        self.psqt_score += self.piece_square_score(piece, *end) - self.piece_square_score(piece, *start)
+        if isinstance(piece, Pawn):
+            self.pawn_key ^= self.piece_key(piece, *start) ^ self.piece_key(piece, *end)
+        if captured_piece:
+            key ^= self.piece_key(captured_piece, *end)
+            if isinstance(captured_piece, Pawn):
+                self.pawn_key ^= self.piece_key(captured_piece, *end)
+            self.material_score -= MATERIAL[self.piece_code(captured_piece)]
+            self.psqt_score -= self.piece_square_score(captured_piece, *end)
 
         # Handle castling
         if isinstance(piece, King) and abs(start[1] - end[1]) == 2:
-            if end[1] > start[1]:  # Kingside castling
-                self.board[end[0]][end[1] - 1] = self.board[end[0]][7]  # Move rook to the king's left
-                self.board[end[0]][7] = None
-            else:  # Queenside castling
-                self.board[end[0]][end[1] + 1] = self.board[end[0]][0]  # Move rook to the king's right
-                self.board[end[0]][0] = None
+            rook_col, new_rook_col = (7, end[1] - 1) if end[1] > start[1] else (0, end[1] + 1)
+            rook = self.board[end[0]][rook_col]
+            self.board[end[0]][new_rook_col] = rook  # Move rook next to the king
+            self.board[end[0]][rook_col] = None
+            key ^= self.piece_key(rook, end[0], rook_col) ^ self.piece_key(rook, end[0], new_rook_col)
+            self.psqt_score += self.piece_square_score(rook, end[0], new_rook_col) - self.piece_square_score(rook, end[0], rook_col)
 
         # Update move tracking
         if isinstance(piece, King):
@@ -78,17 +159,41 @@ class ChessBoard:
                     self.rook_moved[piece.color][1] = True  # Kingside rook
 
         # Handle en passant capture
-        if isinstance(piece, Pawn) and abs(start[1] - end[1]) == 1 and self.board[end[0]][end[1]] is None:
+        if isinstance(piece, Pawn) and abs(start[1] - end[1]) == 1 and captured_piece is None:
+            captured_pawn = self.board[start[0]][end[1]]
+            key ^= self.piece_key(captured_pawn, start[0], end[1])
+            self.pawn_key ^= self.piece_key(captured_pawn, start[0], end[1])
+            self.material_score -= MATERIAL[self.piece_code(captured_pawn)]
+            self.psqt_score -= self.piece_square_score(captured_pawn, start[0], end[1])
             self.board[start[0]][end[1]] = None
 
+        rights = self.castling_rights & CASTLING_RIGHTS_MASK[self.square_index(*start)] & CASTLING_RIGHTS_MASK[self.square_index(*end)]
+        key ^= CASTLING_KEYS[self.castling_rights] ^ CASTLING_KEYS[rights]
+        self.castling_rights = rights
+        if self.en_passant is not None:
+            key ^= EN_PASSANT_KEYS[self.square_index(*self.en_passant) % 8]
+            self.en_passant = None
+        # Only record an en passant square an enemy pawn could actually use
+        if isinstance(piece, Pawn) and abs(start[0] - end[0]) == 2:
+            for col in (end[1] - 1, end[1] + 1):
+                neighbour = self.board[end[0]][col] if 0 <= col < 8 else None
+                if isinstance(neighbour, Pawn) and neighbour.color != piece.color:
+                    self.en_passant = ((start[0] + end[0]) // 2, end[1])
+                    key ^= EN_PASSANT_KEYS[self.square_index(*self.en_passant) % 8]
+                    break
+
+        self.side_to_move = 'black' if self.side_to_move == 'white' else 'white'
+        self.zobrist_key = key ^ WHITE_TO_MOVE_KEY
         self.last_move = move
 
     def undo_move(self):
         if not self.move_history:
             return
 
-        start, end, captured_piece = self.move_history.pop()
-        piece = self.board[end[0]][end[1]]
+        (start, end, captured_piece, castling_rights, en_passant, zobrist_key,
+         material_score, psqt_score, pawn_key, promoted_pawn) = self.move_history.pop()
+        # A promoted piece goes back as the pawn it replaced
+        piece = promoted_pawn or self.board[end[0]][end[1]]
         self.board[start[0]][start[1]] = piece
         self.board[end[0]][end[1]] = captured_piece
 
@@ -110,9 +215,98 @@ class ChessBoard:
 
         # Handle en passant undo
         if isinstance(piece, Pawn) and abs(start[1] - end[1]) == 1 and captured_piece is None:
-            self.board[start[0]][end[1]] = Pawn(piece.color)
-
-        self.last_move = None if not self.move_history else self.move_history[-1]
+            self.board[start[0]][end[1]] = Pawn('black' if piece.color == 'white' else 'white')
+
+        self.castling_rights = castling_rights
+        self.en_passant = en_passant
+        self.side_to_move = 'black' if self.side_to_move == 'white' else 'white'
+        self.zobrist_key = zobrist_key
+        self.material_score = material_score
+        self.psqt_score = psqt_score
+        self.pawn_key = pawn_key
+        self.last_move = None if not self.move_history else self.move_history[-1][:2]
+
+    def promote(self, position, piece_class):
+        # Replace the pawn that just reached the last rank, keeping the key in step
+        row, col = position
+        pawn = self.board[row][col]
+        promoted = piece_class(pawn.color)
+        self.board[row][col] = promoted
+        self.zobrist_key ^= self.piece_key(pawn, row, col) ^ self.piece_key(promoted, row, col)
+        self.pawn_key ^= self.piece_key(pawn, row, col)
+        self.material_score += MATERIAL[self.piece_code(promoted)] - MATERIAL[self.piece_code(pawn)]
+        self.psqt_score += self.piece_square_score(promoted, row, col) - self.piece_square_score(pawn, row, col)
+        # Let undo_move put the pawn back
+        if self.move_history and self.move_history[-1][1] == position:
+            self.move_history[-1] = self.move_history[-1][:-1] + (pawn,)
+
+    def snapshot(self):
+        # Immutable, picklable copy of the position (no move history)
+        squares = ''.join(
+            '.' if piece is None else (piece.symbol if piece.color == 'white' else piece.symbol.lower())
+            for row in self.board for piece in row
+        )
+        return (squares, self.flipped, self.side_to_move, self.castling_rights, self.en_passant,
+                self.last_move, self.zobrist_key, self.pawn_key, self.material_score, self.psqt_score,
+                (self.king_moved['white'], self.king_moved['black']),
+                (tuple(self.rook_moved['white']), tuple(self.rook_moved['black'])))
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        (squares, flipped, side_to_move, castling_rights, en_passant,
+         last_move, zobrist_key, pawn_key, material_score, psqt_score, king_moved, rook_moved) = snapshot
+        chess_board = cls.__new__(cls)
+        chess_board.board = [[SHARED_PIECES.get(symbol) for symbol in squares[row:row + 8]] for row in range(0, 64, 8)]
+        chess_board.last_move = last_move
+        chess_board.move_history = []
+        chess_board.king_moved = {'white': king_moved[0], 'black': king_moved[1]}
+        chess_board.rook_moved = {'white': list(rook_moved[0]), 'black': list(rook_moved[1])}
+        chess_board.flipped = flipped
+        chess_board.side_to_move = side_to_move
+        chess_board.castling_rights = castling_rights
+        chess_board.en_passant = en_passant
+        chess_board.zobrist_key = zobrist_key
+        chess_board.pawn_key = pawn_key
+        chess_board.material_score = material_score
+        chess_board.psqt_score = psqt_score
+        chess_board.status_cache = {}
+        return chess_board
+
+    def clone(self):
+        return self.from_snapshot(self.snapshot())
+
+    @classmethod
+    def from_bitboard(cls, bitboard, flipped=False):
+        chess_board = cls(flipped=flipped)
+        chess_board.board = [[None for _ in range(8)] for _ in range(8)]
+        for position, piece in enumerate(bitboard.mailbox):
+            if piece is not None:
+                row, col = chess_board.square_position(position)
+                chess_board.board[row][col] = SHARED_PIECES[PIECE_SYMBOLS[piece]]
+        chess_board.side_to_move = bitboard.side_to_move
+        chess_board.castling_rights = bitboard.castling_rights
+        if bitboard.en_passant is not None:
+            chess_board.en_passant = chess_board.square_position(bitboard.en_passant)
+        # Castling moves offered by get_castling_moves follow the rights
+        chess_board.king_moved = {
+            'white': not bitboard.castling_rights & (WHITE_KINGSIDE | WHITE_QUEENSIDE),
+            'black': not bitboard.castling_rights & (BLACK_KINGSIDE | BLACK_QUEENSIDE),
+        }
+        kingside = {'white': WHITE_KINGSIDE, 'black': BLACK_KINGSIDE}
+        queenside = {'white': WHITE_QUEENSIDE, 'black': BLACK_QUEENSIDE}
+        chess_board.rook_moved = {color: [not bitboard.castling_rights & queenside[color],
+                                          not bitboard.castling_rights & kingside[color]]
+                                  for color in ('white', 'black')}
+        chess_board.load_state(chess_board.board)
+        return chess_board
+
+    @classmethod
+    def from_fen(cls, fen, flipped=False):
+        return cls.from_bitboard(BitboardChessBoard.from_fen(fen), flipped)
+
+    def to_fen(self):
+        # ChessBoard does not count moves, so the counters are always 0 1
+        return self.board_to_bitboard().to_fen()
 
     def get_valid_moves(self, position, flipped=False):
         x, y = position
@@ -175,16 +369,7 @@ class ChessBoard:
         return False
 
     def is_in_check(self, color):
-        king_position = self.find_king(color)
-        if not king_position:
-            return False
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and piece.color != color:
-                    if king_position in piece.valid_moves((row, col), self.board):
-                        return True
-        return False
+        return self.board_to_bitboard().is_in_check(color)
 
     def find_king(self, color):
         for row in range(8):
@@ -194,57 +379,63 @@ class ChessBoard:
                     return (row, col)
         return None
 
-    def is_checkmate(self, color):
-        if not self.is_in_check(color):
-            return False
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and piece.color == color:
-                    for move in piece.valid_moves((row, col), self.board):
-                        # Simulate the move
-                        original_piece = self.board[move[0]][move[1]]
-                        self.board[move[0]][move[1]] = piece
-                        self.board[row][col] = None
-                        in_check = self.is_in_check(color)
-                        # Undo the move
-                        self.board[row][col] = piece
-                        self.board[move[0]][move[1]] = original_piece
-                        if not in_check:
-                            return False
-        return True
+    def get_status(self, color):
+        # Legal ((row, col), (row, col)) moves, check state and result from
+        # one bitboard pass, memoised per key. A promotion is listed once
+        # and completed with promote(); the move tuple must not be mutated
+        cache_key = (self.zobrist_key, color)
+        status = self.status_cache.get(cache_key)
+        if status is None:
+            bitboard_status = self.board_to_bitboard().get_status(color)
+            moves = tuple((self.square_position(move[0]), self.square_position(move[1]))
+                          for move in bitboard_status.moves if len(move) == 2 or move[2] % 6 == QUEEN)
+            status = PositionStatus(moves, bitboard_status.in_check, bitboard_status.result)
+            if len(self.status_cache) >= STATUS_CACHE_SIZE:
+                self.status_cache.clear()
+            self.status_cache[cache_key] = status
+        return status
+
+    def static_exchange(self, move):
+        # Material won by the capture sequence a move starts, see
+        # BitboardChessBoard.static_exchange
+        start, end = move
+        return self.board_to_bitboard().static_exchange(self.square_index(*start), self.square_index(*end))
 
-    def is_stalemate(self, color):
-        if self.is_in_check(color):
-            return False
+    def get_legal_moves(self, color):
+        return list(self.get_status(color).moves)
 
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and piece.color == color:
-                    valid_moves = self.get_valid_moves((row, col))
-                    if valid_moves:
-                        return False
+    def is_checkmate(self, color):
+        return self.get_status(color).result == CHECKMATE
 
-        return True
+    def is_stalemate(self, color):
+        return self.get_status(color).result == STALEMATE
 
     def board_to_bitboard(chess_board):
-        bitboard = BitboardChessBoard()
+        bitboard = BitboardChessBoard(empty=True)
         for row in range(8):
             for col in range(8):
                 piece = chess_board.board[row][col]
                 if piece:
-                    position = row * 8 + col
+                    position = chess_board.square_index(row, col)
                     symbol = piece.symbol.lower() if piece.color == 'black' else piece.symbol.upper()
-                    bitboard.set_piece(symbol, position)
+                    bitboard.set_piece(PIECE_CODES[symbol], position)
+        bitboard.side_to_move = chess_board.side_to_move
+        bitboard.castling_rights = chess_board.castling_rights
+        if chess_board.en_passant is not None:
+            bitboard.en_passant = chess_board.square_index(*chess_board.en_passant)
+        bitboard.zobrist_key = bitboard.compute_zobrist_key()
         return bitboard
 
+    def square_position(chess_board, position):
+        # Inverse of square_index: (row, col) of a bitboard square
+        return divmod(63 - position if chess_board.flipped else position, 8)
+
     def bitboard_to_board(bitboard, chess_board):
-        for piece, bb in bitboard.bitboards.items():
+        for piece, bb in enumerate(bitboard.bitboards):
             while bb:
                 position = bb.bit_length() - 1
                 row, col = divmod(position, 8)
                 # Create a new piece instance based on the symbol
-                piece_instance = create_piece_from_symbol(piece)
+                piece_instance = create_piece_from_symbol(PIECE_SYMBOLS[piece])
                 chess_board.board[row][col] = piece_instance
                 bb &= ~(1 << position)
\ No newline at end of file
@@ -0,0 +1,114 @@
+# FEN and EPD position files.
+#
+# An EPD record is the first four FEN fields followed by operations, e.g.
+#
+#     r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - bm Qxf7#; id "mate.001";
+#
+# Files are read one line at a time, so a file of any size is streamed in
+# constant memory; lines may be EPD or plain FEN, and .gz files are
+# decompressed on the fly. iter_records yields the text of each record
+# without building a board, for callers that hand positions on elsewhere.
+import gzip
+import io
+import re
+
+from .bitboard import BitboardChessBoard
+
+OPERATION_TOKENS = re.compile(r'("[^"]*")|([^\s;"]+)|(;)')
+
+def parse_operations(text):
+    # {opcode: [operands]} of an EPD operation list; operands may be quoted
+    operations = {}
+    if '"' not in text:
+        for operation in text.split(';'):
+            tokens = operation.split()
+            if tokens:
+                operations[tokens[0]] = tokens[1:]
+        return operations
+    operands = None
+    for quoted, token, separator in OPERATION_TOKENS.findall(text):
+        if separator:
+            operands = None
+        elif operands is None:
+            if quoted or not token:
+                raise ValueError(f"Invalid EPD operations: {text!r}")
+            operands = operations[token] = []
+        else:
+            operands.append(quoted[1:-1] if quoted else token)
+    if text.count('"') % 2:
+        raise ValueError(f"Unterminated string in EPD operations: {text!r}")
+    return operations
+
+def format_operations(operations):
+    parts = []
+    for opcode, operands in operations.items():
+        values = [operand if operand and not any(char in operand for char in ' ;"') else f'"{operand}"'
+                  for operand in operands]
+        parts.append(' '.join([opcode] + values) + ';')
+    return ' '.join(parts)
+
+def parse_record(line):
+    # (fen, operations) of an EPD or FEN line. EPD move counters come from
+    # its hmvc and fmvn operations when present
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError(f"Invalid EPD or FEN: {line!r}")
+    rest = fields[4] if len(fields) == 5 else ''
+    counters = rest.split()
+    if len(counters) == 2 and counters[0].isdigit() and counters[1].isdigit():
+        return line.strip(), {}
+    operations = parse_operations(rest) if rest else {}
+    halfmove = operations.get('hmvc', ['0'])[0]
+    fullmove = operations.get('fmvn', ['1'])[0]
+    return ' '.join(fields[:4] + [halfmove, fullmove]), operations
+
+def to_epd(board, operations=None):
+    # The position as EPD: four FEN fields and the operations, if any
+    record = ' '.join(board.to_fen().split()[:4])
+    if operations:
+        record += ' ' + format_operations(operations)
+    return record
+
+def open_positions(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='ascii')
+    return io.open(path, 'r', encoding='ascii')
+
+def iter_records(source, skip_invalid=False):
+    # (line number, fen, operations) of each record in a path or an open
+    # text file; blank lines and lines starting with # are skipped, and a
+    # malformed record raises ValueError with its line number unless
+    # skip_invalid is set
+    handle = open_positions(source) if isinstance(source, str) else source
+    try:
+        for number, line in enumerate(handle, 1):
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            try:
+                fen, operations = parse_record(line)
+            except ValueError as error:
+                if skip_invalid:
+                    continue
+                raise ValueError(f"Line {number}: {error}") from None
+            yield number, fen, operations
+    finally:
+        if handle is not source:
+            handle.close()
+
+def read_positions(source, board_class=BitboardChessBoard, skip_invalid=False):
+    # (board, operations) for each record, built with board_class.from_fen
+    for number, fen, operations in iter_records(source, skip_invalid):
+        try:
+            board = board_class.from_fen(fen)
+        except ValueError as error:
+            if skip_invalid:
+                continue
+            raise ValueError(f"Line {number}: {error}") from None
+        yield board, operations
+
+def write_positions(path, positions):
+    # Write (board, operations) pairs as EPD, one per line
+    output = gzip.open(path, 'wt', encoding='ascii') if path.endswith('.gz') else io.open(path, 'w', encoding='ascii')
+    with output:
+        for board, operations in positions:
+            output.write(to_epd(board, operations) + '\n')
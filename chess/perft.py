@@ -0,0 +1,257 @@
+# Perft: count the leaf nodes of the legal move tree to a fixed depth.
+#
+# Counts are compared against published values to validate move generation
+# (including castling, en passant and promotion) and timed to track the
+# speed of both board representations. Run as a module:
+#
+#     python -m chess.perft --suite --depth 3 --json perft.json
+#     python -m chess.perft --fen "<fen>" --depth 4 --divide --board chess_board
+import argparse
+import concurrent.futures
+import json
+import platform
+import sys
+import time
+from array import array
+
+from .bitboard import BitboardChessBoard
+from .chess_board import ChessBoard
+from .pieces import Pawn, Queen, Rook, Bishop, Knight
+
+BOARD_CLASSES = {'bitboard': BitboardChessBoard, 'chess_board': ChessBoard}
+
+# Standard positions with known node counts for depths 1, 2, 3, ...
+PERFT_SUITE = [
+    ('initial', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+     [20, 400, 8902, 197281, 4865609]),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603]),
+    ('position3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     [14, 191, 2812, 43238, 674624]),
+    ('position4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     [6, 264, 9467, 422333]),
+    ('position5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     [44, 1486, 62379, 2103487]),
+    ('position6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     [46, 2079, 89890, 3894594]),
+]
+
+PROMOTION_CLASSES = [Queen, Rook, Bishop, Knight]
+PROMOTION_LETTERS = 'qrbn'
+
+class PerftHashTable:
+    # Direct-mapped table of subtree counts keyed by Zobrist key and depth.
+    # Transpositions are common in perft trees, so whole subtrees are reused
+
+    def __init__(self, size_mb=16):
+        entries = max(1, (size_mb * 1024 * 1024) // 17)
+        self.size = 1 << (entries.bit_length() - 1)
+        self.mask = self.size - 1
+        self.keys = array('Q', bytes(8 * self.size))
+        self.counts = array('Q', bytes(8 * self.size))
+        self.depths = bytearray(self.size)  # 0 marks an empty slot
+        self.hits = 0
+
+    def probe(self, key, depth):
+        index = (key ^ depth) & self.mask
+        if self.depths[index] == depth and self.keys[index] == key:
+            self.hits += 1
+            return self.counts[index]
+        return None
+
+    def store(self, key, depth, count):
+        index = (key ^ depth) & self.mask
+        self.keys[index] = key
+        self.depths[index] = depth
+        self.counts[index] = count
+
+def square_name(position):
+    row, col = divmod(position, 8)
+    return 'abcdefgh'[col] + str(8 - row)
+
+def is_promotion(chess_board, move):
+    start, end = move
+    return isinstance(chess_board.board[start[0]][start[1]], Pawn) and end[0] in (0, 7)
+
+def root_moves(board):
+    # (move, promotion) pairs; ChessBoard lists a promotion once and
+    # completes it with promote(), so it is expanded to every piece here
+    if isinstance(board, BitboardChessBoard):
+        return [(move, None) for move in board.generate_legal_moves(board.side_to_move)]
+    moves = []
+    for move in board.get_status(board.side_to_move).moves:
+        if is_promotion(board, move):
+            moves.extend((move, piece_class) for piece_class in PROMOTION_CLASSES)
+        else:
+            moves.append((move, None))
+    return moves
+
+def make_move(board, move, promotion):
+    if isinstance(board, BitboardChessBoard):
+        board.update_board(*move)
+    else:
+        board.update_board(move)
+        if promotion:
+            board.promote(move[1], promotion)
+
+def move_name(board, move, promotion):
+    if isinstance(board, BitboardChessBoard):
+        name = square_name(move[0]) + square_name(move[1])
+        return name + ('' if len(move) == 2 else PROMOTION_LETTERS[[4, 3, 2, 1].index(move[2] % 6)])
+    name = square_name(board.square_index(*move[0])) + square_name(board.square_index(*move[1]))
+    return name + ('' if promotion is None else PROMOTION_LETTERS[PROMOTION_CLASSES.index(promotion)])
+
+def perft(board, depth, hash_table=None):
+    if depth == 0:
+        return 1
+    if hash_table is not None:
+        count = hash_table.probe(board.zobrist_key, depth)
+        if count is not None:
+            return count
+
+    if isinstance(board, BitboardChessBoard):
+        moves = board.generate_legal_moves(board.side_to_move)
+        if depth == 1:
+            return len(moves)
+        count = 0
+        for move in moves:
+            board.update_board(*move)
+            count += perft(board, depth - 1, hash_table)
+            board.undo_move()
+    else:
+        moves = root_moves(board)
+        if depth == 1:
+            return len(moves)
+        count = 0
+        for move, promotion in moves:
+            make_move(board, move, promotion)
+            count += perft(board, depth - 1, hash_table)
+            board.undo_move()
+
+    if hash_table is not None:
+        hash_table.store(board.zobrist_key, depth, count)
+    return count
+
+def divide(board, depth, hash_table=None):
+    # Node count below each root move, keyed by its long algebraic name
+    counts = {}
+    for move, promotion in root_moves(board):
+        make_move(board, move, promotion)
+        counts[move_name(board, move, promotion)] = perft(board, depth - 1, hash_table)
+        board.undo_move()
+    return counts
+
+# Per-process hash table for parallel perft, created by the pool initializer
+worker_hash_table = None
+
+def init_perft_worker(hash_mb):
+    global worker_hash_table
+    worker_hash_table = PerftHashTable(hash_mb) if hash_mb else None
+
+def perft_subtree(board_class, position, move, promotion, depth):
+    board = BOARD_CLASSES[board_class].from_snapshot(position)
+    make_move(board, move, promotion)
+    return perft(board, depth - 1, worker_hash_table)
+
+def parallel_divide(board, depth, workers, hash_mb=0):
+    # Root moves are searched in separate processes, each with its own table
+    board_class = 'bitboard' if isinstance(board, BitboardChessBoard) else 'chess_board'
+    position = board.snapshot()
+    moves = root_moves(board)
+    names = []
+    for move, promotion in moves:
+        make_move(board, move, promotion)
+        names.append(move_name(board, move, promotion))
+        board.undo_move()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_perft_worker,
+                                                initargs=(hash_mb,)) as executor:
+        futures = [executor.submit(perft_subtree, board_class, position, move, promotion, depth)
+                   for move, promotion in moves]
+        return {name: future.result() for name, future in zip(names, futures)}
+
+def load_board(board_class, fen):
+    if board_class == 'bitboard':
+        return BitboardChessBoard.from_fen(fen)
+    return ChessBoard.from_fen(fen)
+
+def run_perft(board_class, fen, depth, hash_mb=0, workers=1, split=False):
+    board = load_board(board_class, fen)
+    start_time = time.perf_counter()
+    if workers > 1 and depth > 1:
+        moves = parallel_divide(board, depth, workers, hash_mb)
+    elif split:
+        moves = divide(board, depth, PerftHashTable(hash_mb) if hash_mb else None)
+    else:
+        moves = None
+    if moves is None:
+        nodes = perft(board, depth, PerftHashTable(hash_mb) if hash_mb else None)
+    else:
+        nodes = sum(moves.values())
+    seconds = time.perf_counter() - start_time
+    result = {
+        'board': board_class,
+        'fen': fen,
+        'depth': depth,
+        'nodes': nodes,
+        'seconds': round(seconds, 6),
+        'nps': round(nodes / seconds) if seconds else None,
+        'hash_mb': hash_mb,
+        'workers': workers,
+    }
+    if split and moves is not None:
+        result['divide'] = moves
+    return result
+
+def run_suite(board_class, max_depth, hash_mb=0, workers=1):
+    results = []
+    for name, fen, expected in PERFT_SUITE:
+        for depth in range(1, min(max_depth, len(expected)) + 1):
+            result = run_perft(board_class, fen, depth, hash_mb, workers)
+            result['name'] = name
+            result['expected'] = expected[depth - 1]
+            result['passed'] = result['nodes'] == expected[depth - 1]
+            results.append(result)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count and time move generation to a fixed depth.")
+    parser.add_argument('--board', choices=sorted(BOARD_CLASSES), default='bitboard')
+    parser.add_argument('--fen', default=PERFT_SUITE[0][1])
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--suite', action='store_true', help="run the standard positions up to --depth")
+    parser.add_argument('--divide', action='store_true', help="report the count below each root move")
+    parser.add_argument('--hash', type=int, default=0, metavar='MB', help="reuse subtree counts from a hash table")
+    parser.add_argument('--workers', type=int, default=1, help="split root moves across processes")
+    parser.add_argument('--json', metavar='PATH', help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.suite:
+        results = run_suite(args.board, args.depth, args.hash, args.workers)
+    else:
+        results = [run_perft(args.board, args.fen, args.depth, args.hash, args.workers, args.divide)]
+
+    failed = 0
+    for result in results:
+        for name, count in sorted(result.get('divide', {}).items()):
+            print(f"{name}: {count}")
+        status = ''
+        if 'expected' in result:
+            status = ' ok' if result['passed'] else f" FAILED (expected {result['expected']})"
+            failed += not result['passed']
+        label = result.get('name', result['fen'])
+        print(f"{label} depth {result['depth']}: {result['nodes']} nodes "
+              f"in {result['seconds']:.3f}s ({result['nps'] or 0} nps){status}")
+
+    if args.json:
+        report = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'results': results,
+        }
+        with open(args.json, 'w') as output:
+            json.dump(report, output, indent=2)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,6 +8,7 @@ from chess.ai.random_ai import RandomAI
 from chess.ai.minimax_ai import MinimaxAI
 from chess.ai.minimax_bit_ai import MinimaxBitAI
 from chess.theme import Theme
+from chess.bitboard import CHECKMATE, STALEMATE
 
 # Constants
 SQUARE_SIZE = 120
@@ -117,13 +118,7 @@ class ChessApp:
         col = event.x // SQUARE_SIZE
         row = event.y // SQUARE_SIZE
 
-        if self.chess_board.is_checkmate(self.current_turn):
-            print(f"Checkmate! {self.current_turn} loses.")
-            self.show_main_menu()   
-            return
-        elif self.chess_board.is_stalemate(self.current_turn):
-            print("Stalemate! The game is a draw.")
-            self.show_main_menu()
+        if self.check_game_over():
             return
 
         if self.selected_piece:
@@ -140,17 +135,9 @@ class ChessApp:
                     self.valid_moves = []
                     self.prompt_promotion(row, col)
                     return
-                if self.chess_board.is_checkmate(self.current_turn):
-                    print(f"Checkmate! {self.current_turn} loses.")
-                    self.show_main_menu()
-                    return
-                elif self.chess_board.is_stalemate(self.current_turn):
-                    print("Stalemate! The game is a draw.")
-                    self.show_main_menu()
-                    return
                 self.current_turn = 'black' if self.current_turn == 'white' else 'white'
-                if self.ai and self.current_turn == self.ai.color:
-                    self.ai_move()  
+                if not self.check_game_over() and self.ai and self.current_turn == self.ai.color:
+                    self.ai_move()
             self.selected_piece = None
             self.valid_moves = []
 
@@ -158,46 +145,48 @@ class ChessApp:
             piece = self.chess_board.board[row][col]
             if piece and piece.color == self.current_turn:
                 self.selected_piece = (row, col)
-                self.valid_moves = self.chess_board.get_valid_moves((row, col), self.flipped)
-                # Filter out moves that leave the king in check
-                self.valid_moves = [move for move in self.valid_moves if not self.move_leaves_king_in_check((row, col), move)]
+                # Legal moves come from the cached status of the position
+                status = self.chess_board.get_status(self.current_turn)
+                self.valid_moves = [end for start, end in status.moves if start == (row, col)]
         self.draw_board()
 
     def ai_move(self):
         self.chess_board.print_board_state()
-        move, promotion_choice = self.ai.make_move(self.chess_board, self.flipped)
+        result = self.ai.make_move(self.chess_board, self.flipped)
+        move, promotion_choice = result
+        print(f"{type(self.ai).__name__}: {result.stats}")
         if move:
             start, end = move
             piece = self.chess_board.board[start[0]][start[1]]
 
+            self.chess_board.update_board(move)  # Apply the move
             if promotion_choice and isinstance(piece, Pawn) and (end[0] == 0 or end[0] == 7):
                 # Apply promotion
-                self.chess_board.board[end[0]][end[1]] = promotion_choice(piece.color)
-                self.chess_board.board[start[0]][start[1]] = None
-            else:
-                self.chess_board.update_board(move)  # Apply the move
+                self.chess_board.promote(end, promotion_choice)
 
             self.last_move = move
-            if self.chess_board.is_checkmate(self.current_turn):
-                print(f"Checkmate! {self.current_turn} loses.")
-                self.show_main_menu()
-                return
-            elif self.chess_board.is_stalemate(self.current_turn):
-                print("Stalemate! The game is a draw.")
-                self.show_main_menu()
-                return
             self.current_turn = 'white' if self.current_turn == 'black' else 'black'
+            self.check_game_over()
         self.draw_board()
 
+    def check_game_over(self):
+        status = self.chess_board.get_status(self.current_turn)
+        if status.result == CHECKMATE:
+            print(f"Checkmate! {self.current_turn} loses.")
+        elif status.result == STALEMATE:
+            print("Stalemate! The game is a draw.")
+        else:
+            return False
+        self.show_main_menu()
+        return True
+
     def prompt_promotion(self, row, col):
         promotion_window = tk.Toplevel(self.root)
         promotion_window.title("Promote Pawn")
         promotion_window.geometry("200x100")
 
-        current_color = self.chess_board.board[row][col].color
-
         def promote_to(piece_class):
-            self.chess_board.board[row][col] = piece_class(current_color)
+            self.chess_board.promote((row, col), piece_class)
             print(f"Promoted pawn at ({row}, {col}) to {piece_class.__name__}")
             promotion_window.destroy()
             self.after_promotion()  # Call a method to handle post-promotion actions
@@ -208,33 +197,13 @@ class ChessApp:
         tk.Button(promotion_window, text="Knight", command=lambda: promote_to(Knight)).pack(fill=tk.X)
 
     def after_promotion(self):
-        # Check for checkmate after promotion
-        if self.chess_board.is_checkmate(self.current_turn):
-            print(f"Checkmate! {self.current_turn} loses.")
-            self.show_main_menu()
-            return
-        elif self.chess_board.is_stalemate(self.current_turn):
-            print("Stalemate! The game is a draw.")
-            self.show_main_menu()
-            return
-
-        # Switch turns
+        # Switch turns, then check whether the promotion ended the game
         self.current_turn = 'black' if self.current_turn == 'white' else 'white'
-        if self.ai and self.current_turn == self.ai.color:
+        if not self.check_game_over() and self.ai and self.current_turn == self.ai.color:
            self.ai_move()
 
         self.draw_board()
 
-    def move_leaves_king_in_check(self, start, end):
-        piece = self.chess_board.board[start[0]][start[1]]
-        original_piece = self.chess_board.board[end[0]][end[1]]
-        self.chess_board.board[end[0]][end[1]] = piece
-        self.chess_board.board[start[0]][start[1]] = None
-        in_check = self.chess_board.is_in_check(self.current_turn)
-        self.chess_board.board[start[0]][start[1]] = piece
-        self.chess_board.board[end[0]][end[1]] = original_piece
-        return in_check
-
     def flip_board(self, event=None):
         self.flipped = not self.flipped
         self.draw_board()
@@ -331,6 +300,11 @@ class ChessApp:
     def restart_game(self):
         self.flipped = not self.flipped
         self.chess_board = ChessBoard(flipped=self.flipped)
+        if self.ai:
+            # Engines that do not cache evaluations have a single-slot cache
+            if self.ai.evaluation_cache.size > 1:
+                print(f"Evaluation cache: {self.ai.evaluation_cache.stats()}")
+            self.ai.new_game()
         self.current_turn = 'white'
         self.selected_piece = None
         self.valid_moves = []